@@ -0,0 +1,107 @@
+import time
+
+ARMED = "armed"
+FIRING = "firing"
+RECOVERED = "recovered"
+
+# Kinds of event returned by AlertEngine.update
+FIRE = "fire"
+RENOTIFY = "renotify"
+RECOVER = "recover"
+
+
+class AlertEvent:
+    """Something the caller should notify about"""
+
+    def __init__(self, kind, value, notification, escalated, started_at):
+        self.kind = kind
+        self.value = value
+        self.notification = notification  # 1 for the first notification of an incident
+        self.escalated = escalated
+        self.started_at = started_at
+
+    def __repr__(self):
+        return f"AlertEvent({self.kind}, value={self.value}, notification={self.notification}, escalated={self.escalated})"
+
+
+class AlertEngine:
+    """Low-value alert with hysteresis, growing re-notify intervals and a per-incident cap
+
+    ARMED -> FIRING when the value drops below trigger.
+    FIRING -> RECOVERED when the value climbs back to clear (>= trigger).
+    RECOVERED -> ARMED after cooldown seconds; dropping below trigger during the
+    cooldown resumes the previous incident instead of opening a new one.
+    An incident sends at most max_notifications alerts plus one recovery notice.
+    """
+
+    def __init__(self, name, trigger, clear=None, renotify_intervals=(600, 1800, 3600),
+                 escalate_after=3, max_notifications=10, cooldown=600):
+        self.name = name
+        self.state = ARMED
+        self.started_at = None
+        self.recovered_at = None
+        self.last_notified = None
+        self.notifications = 0
+        self.recovery_notified = False
+        self.configure(trigger, clear, renotify_intervals, escalate_after, max_notifications, cooldown)
+
+    def configure(self, trigger, clear=None, renotify_intervals=(600, 1800, 3600),
+                  escalate_after=3, max_notifications=10, cooldown=600):
+        """Apply new thresholds and limits without resetting the current incident"""
+        self.trigger = trigger
+        self.clear = max(clear if clear is not None else trigger, trigger)
+        self.renotify_intervals = tuple(renotify_intervals) or (600,)
+        self.escalate_after = escalate_after
+        self.max_notifications = max_notifications
+        self.cooldown = cooldown
+
+    def update(self, value, now=None):
+        """Feed a new value; returns an AlertEvent if a notification should go out"""
+        now = time.time() if now is None else now
+
+        if self.state == RECOVERED and now - self.recovered_at >= self.cooldown:
+            self.state = ARMED
+            self.notifications = 0
+            self.recovery_notified = False
+            self.started_at = None
+
+        if self.state == ARMED:
+            if value < self.trigger:
+                self.state = FIRING
+                self.started_at = now
+                return self._notify(FIRE, value, now)
+            return None
+
+        if self.state == RECOVERED:
+            if value < self.trigger:
+                # Flapping around the threshold; continue the previous incident
+                self.state = FIRING
+                return self._maybe_renotify(value, now)
+            return None
+
+        # FIRING
+        if value >= self.clear:
+            self.state = RECOVERED
+            self.recovered_at = now
+            if self.recovery_notified:
+                return None
+            # One recovery notice per incident, even if the value flaps
+            self.recovery_notified = True
+            return AlertEvent(RECOVER, value, self.notifications, self.is_escalated(), self.started_at)
+        return self._maybe_renotify(value, now)
+
+    def is_escalated(self):
+        return self.notifications >= self.escalate_after
+
+    def _maybe_renotify(self, value, now):
+        if self.notifications >= self.max_notifications:
+            return None
+        interval = self.renotify_intervals[min(self.notifications - 1, len(self.renotify_intervals) - 1)]
+        if now - self.last_notified < interval:
+            return None
+        return self._notify(RENOTIFY, value, now)
+
+    def _notify(self, kind, value, now):
+        self.notifications += 1
+        self.last_notified = now
+        return AlertEvent(kind, value, self.notifications, self.is_escalated(), self.started_at)
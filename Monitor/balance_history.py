@@ -0,0 +1,143 @@
+import array
+import bisect
+import os
+import struct
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+# One on-disk sample: int64 epoch seconds + float64 balance, little endian
+RECORD = struct.Struct('<qd')
+
+SECONDS_PER_DAY = 86400
+
+
+class BalanceHistory:
+    """Fixed-size ring of (epoch second, balance) samples backed by an append-only binary log"""
+
+    def __init__(self, capacity=8640, log_path=None):
+        self.capacity = capacity
+        self.timestamps = array.array('q', bytes(8 * capacity))
+        self.values = array.array('d', bytes(8 * capacity))
+        self.head = 0  # Next slot to write
+        self.size = 0
+
+        # Running stats for the current UTC day
+        self.day = None
+        self.day_open = None
+        self.day_peak = None
+        self.day_max_drawdown = 0.0
+
+        self.log_path = log_path
+        self._log = None
+        if log_path:
+            self._load_log()
+            self._log = open(log_path, 'ab')
+
+    def append(self, balance, timestamp=None):
+        """Record a balance sample; returns True if a new UTC day started"""
+        ts = int(time.time() if timestamp is None else timestamp)
+        new_day = self._record(ts, float(balance))
+        if self._log:
+            self._log.write(RECORD.pack(ts, float(balance)))
+            self._log.flush()
+        return new_day
+
+    def latest(self):
+        """Return the most recent (timestamp, balance) sample, or None"""
+        if not self.size:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self.timestamps[i], self.values[i]
+
+    def daily_pnl(self):
+        """Balance change since the first sample of the current UTC day"""
+        if not self.size or not self.day_open:
+            return 0.0
+        return self.values[(self.head - 1) % self.capacity] - self.day_open
+
+    def max_drawdown(self):
+        """Largest peak-to-trough drop seen during the current UTC day"""
+        return self.day_max_drawdown
+
+    def delta(self, minutes):
+        """Balance change over the last N minutes, or None without enough history"""
+        latest = self.latest()
+        if latest is None:
+            return None
+        ts, balance = latest
+        past = self.value_at(ts - minutes * 60)
+        if past is None:
+            return None
+        return balance - past
+
+    def value_at(self, timestamp):
+        """Balance as of timestamp: the newest sample at or before it, or None"""
+        if not self.size:
+            return None
+        start = (self.head - self.size) % self.capacity
+        ordered = _RingView(self.timestamps, start, self.size)
+        i = bisect.bisect_right(ordered, timestamp)
+        if i == 0:
+            return None
+        return self.values[(start + i - 1) % self.capacity]
+
+    def close(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def _record(self, ts, balance):
+        self.timestamps[self.head] = ts
+        self.values[self.head] = balance
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+        day = ts // SECONDS_PER_DAY
+        if self.day != day:
+            self.day = day
+            self.day_open = balance
+            self.day_peak = balance
+            self.day_max_drawdown = 0.0
+            return True
+        if balance > self.day_peak:
+            self.day_peak = balance
+        self.day_max_drawdown = max(self.day_max_drawdown, self.day_peak - balance)
+        return False
+
+    def _load_log(self):
+        """Replay the tail of the on-disk log into the ring"""
+        if not os.path.exists(self.log_path):
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            return
+        try:
+            with open(self.log_path, 'r+b') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                # Drop a partial record left by a crash mid-write
+                usable = size - size % RECORD.size
+                if usable != size:
+                    f.truncate(usable)
+                start = max(0, usable - self.capacity * RECORD.size)
+                f.seek(start)
+                data = f.read(usable - start)
+            for ts, balance in RECORD.iter_unpack(data):
+                self._record(ts, balance)
+            print(f"Loaded {self.size} balance samples from {self.log_path}")
+        except OSError as e:
+            print(f"Error loading balance history: {e}")
+
+
+class _RingView:
+    """Sequence view over a ring slice in insertion order, for bisect"""
+
+    def __init__(self, data, start, size):
+        self.data = data
+        self.start = start
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return self.data[(self.start + i) % len(self.data)]
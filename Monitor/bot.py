@@ -1,24 +1,33 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
-import re
-from statistics import mean, median
 import asyncio
-from datetime import datetime, timedelta
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 import pytz
-import json
-import os
 
-def load_settings():
-    """Load settings from settings.json"""
-    try:
-        settings_path = os.path.join(os.path.dirname(__file__), 'settings.json')
-        with open(settings_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading settings: {e}")
-        return {}
+try:
+    from .settings_store import get_settings, subscribe
+    from .rolling_stats import RollingWindowStats
+    from .event_store import EventStore
+    from .sketches import HourlySketches
+    from .embed_metrics import (
+        FieldSpec, FieldExtractor, RollingMetrics, parse_field_specs, parse_duration, NUMERIC, CATEGORICAL, DURATION
+    )
+    from .time_index import TimeIndex
+except ImportError:
+    from settings_store import get_settings, subscribe
+    from rolling_stats import RollingWindowStats
+    from event_store import EventStore
+    from sketches import HourlySketches
+    from embed_metrics import (
+        FieldSpec, FieldExtractor, RollingMetrics, parse_field_specs, parse_duration, NUMERIC, CATEGORICAL, DURATION
+    )
+    from time_index import TimeIndex
 
-settings = load_settings()
+settings = get_settings()
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -26,132 +35,386 @@ intents.guild_messages = True
 
 bot = commands.Bot(command_prefix='!', intents=intents)
 
-# Store block differences
-block_differences = []  # Will store tuples of (timestamp, difference)
-MONITOR_CHANNEL_ID = settings.get('sharp_webhook_channel_id')  # Changed from sharp_webhook_channel_ids
-STATS_CHANNEL_ID = settings.get('bot_stats_channel_id')
+# Block differences of the last 24 hours, keyed by message time in epoch seconds
+BLOCK_WINDOW_SECONDS = 24 * 60 * 60
+block_stats = RollingWindowStats(BLOCK_WINDOW_SECONDS)  # All monitored channels together
 
-block_frequencies = {}
+def monitor_channel_ids(settings):
+    """sharp_webhook_channel_id followed by any extra sharp_webhook_channel_ids"""
+    channel_ids = []
+    for channel_id in [settings.get('sharp_webhook_channel_id')] + list(settings.get('sharp_webhook_channel_ids') or []):
+        if channel_id and channel_id not in channel_ids:
+            channel_ids.append(channel_id)
+    return channel_ids
+
+MONITOR_CHANNEL_IDS = monitor_channel_ids(settings)
+STATS_CHANNEL_ID = settings.get('bot_stats_channel_id')
 
-# Add this after other global variables
-channel_block_counts = {MONITOR_CHANNEL_ID: 0}  # Simplified to single channel
+# Each channel's own rolling window; a message only touches its channel's and the global one
+channel_stats = {}
 
 last_update = datetime.now()
 
 # Add these new variables after other global variables
 current_stats_message_id = None
+stats_message = None  # Cached stats Message, so edits don't need a fetch first
+last_stats_key = None
+last_stats_edit = 0.0
 berlin_tz = pytz.timezone('Europe/Berlin')
 
-# Add new global variables at the top with other globals
-grpc_counts = {"In-House": 0, "Custom": 0}  # Track GRPC types
+# Incoming messages are parsed by one worker; the stats embed is published by another
+STATS_REFRESH_SECONDS = 300  # Re-render at least this often so the period and expiry stay current
+message_queue = asyncio.Queue()
+stats_changed = asyncio.Event()
+scan_lock = asyncio.Lock()  # Held during a history scan so live messages wait for it
+last_message_ids = {}  # Channel ID -> newest message counted, so nothing is counted twice
+background_tasks = []
+
+# Parsed events survive restarts; startup only backfills messages after the checkpoint
+EVENT_RETENTION_SECONDS = 2 * BLOCK_WINDOW_SECONDS
+HISTORY_COMMIT_EVERY = 500  # Messages between commits during a history scan
+BACKFILL_SLICE_SECONDS = 2 * 60 * 60  # History is fetched in slices of this length, several at a time
+event_store = EventStore()
+state_loaded = False
+
+# Hourly quantile sketches of block differences for the 7 and 30 day trends
+TREND_WINDOWS = ((7, "7d"), (30, "30d"))
+TREND_QUANTILES = (0.5, 0.9, 0.99)
+SKETCH_RETENTION_HOURS = 31 * 24
+block_sketches = HourlySketches(SKETCH_RETENTION_HOURS)
+
+# Embed fields read from every Sharp message; more can be added with bot_tracked_fields
+BLOCK_FIELD = "Block Difference"
+GRPC_FIELD = "GRPC"
+BUILTIN_FIELDS = (
+    FieldSpec(BLOCK_FIELD, NUMERIC),
+    FieldSpec(GRPC_FIELD, CATEGORICAL, categories=("In-House", "Custom")),
+)
+
+def tracked_field_specs(settings):
+    """Built-in fields plus the ones configured in bot_tracked_fields"""
+    builtin_names = {spec.name for spec in BUILTIN_FIELDS}
+    extra = [spec for spec in parse_field_specs(settings.get('bot_tracked_fields') or [])
+             if spec.name not in builtin_names]
+    return list(BUILTIN_FIELDS) + extra
+
+field_specs = tracked_field_specs(settings)
+field_extractor = FieldExtractor(field_specs)
+# Block differences have their own exact stats above; every other field gets a rolling aggregator
+field_metrics = RollingMetrics([spec for spec in field_specs if spec.name != BLOCK_FIELD], BLOCK_WINDOW_SECONDS)
+
+# Every parsed field by time for the slash commands; windows past EVENT_RETENTION_SECONDS use the sketches
+field_index = {}
+commands_synced = False
+
+@subscribe
+def apply_settings(new_settings):
+    """Pick up channel changes made while the bot is running"""
+    global settings, MONITOR_CHANNEL_IDS, STATS_CHANNEL_ID, field_specs, field_extractor
+    settings = new_settings
+    MONITOR_CHANNEL_IDS = monitor_channel_ids(new_settings)
+    STATS_CHANNEL_ID = new_settings.get('bot_stats_channel_id')
+    field_specs = tracked_field_specs(new_settings)
+    field_extractor = FieldExtractor(field_specs)
+    field_metrics.configure([spec for spec in field_specs if spec.name != BLOCK_FIELD])
 
 @bot.event
 async def on_ready():
+    global state_loaded, commands_synced
     print(f'Bot is ready as {bot.user}')
+    # on_ready fires again after reconnects; stored state is only loaded once
+    if not state_loaded:
+        load_state()
+        state_loaded = True
+    if not commands_synced:
+        try:
+            synced = await bot.tree.sync()
+            commands_synced = True
+            print(f"Synced {len(synced)} slash commands")
+        except discord.HTTPException as e:
+            print(f"Error syncing slash commands: {e}")
+    if not background_tasks:
+        background_tasks.append(asyncio.create_task(process_messages()))
+        background_tasks.append(asyncio.create_task(publish_stats()))
     # Add debug logging
-    print(f'Monitoring channel ID: {MONITOR_CHANNEL_ID}')
+    print(f'Monitoring channel IDs: {", ".join(str(channel_id) for channel_id in MONITOR_CHANNEL_IDS)}')
     print(f'Stats channel ID: {STATS_CHANNEL_ID}')
     
     # Check if channels exist and bot has permissions
-    monitor_channel = bot.get_channel(MONITOR_CHANNEL_ID)
     stats_channel = bot.get_channel(STATS_CHANNEL_ID)
-    
-    if not monitor_channel:
-        print(f"ERROR: Could not find monitor channel with ID {MONITOR_CHANNEL_ID}")
-        return
     if not stats_channel:
         print(f"ERROR: Could not find stats channel with ID {STATS_CHANNEL_ID}")
         return
-        
-    print(f"Found monitor channel: #{monitor_channel.name}")
     print(f"Found stats channel: #{stats_channel.name}")
     
-    # Check permissions
-    bot_member = monitor_channel.guild.get_member(bot.user.id)
     required_permissions = ['view_channel', 'send_messages', 'embed_links', 'read_message_history']
+    monitor_channels = []
+    for channel_id in MONITOR_CHANNEL_IDS:
+        monitor_channel = bot.get_channel(channel_id)
+        if not monitor_channel:
+            print(f"ERROR: Could not find monitor channel with ID {channel_id}")
+            continue
+        print(f"Found monitor channel: #{monitor_channel.name}")
+        monitor_channels.append(monitor_channel)
     
-    for channel in [monitor_channel, stats_channel]:
+    # Check permissions; a channel we can't read is skipped, the stats channel is required
+    usable_channels = []
+    for channel in [stats_channel] + monitor_channels:
+        bot_member = channel.guild.get_member(bot.user.id)
         missing_perms = [perm for perm in required_permissions 
                         if not getattr(channel.permissions_for(bot_member), perm)]
         if missing_perms:
             print(f"ERROR: Missing permissions in #{channel.name}: {', '.join(missing_perms)}")
-            return
+            if channel is stats_channel:
+                return
+            continue
+        if channel is not stats_channel:
+            usable_channels.append(channel)
     
     # If we get here, permissions look good
     print("Starting history scan...")
-    await scan_channel_history(monitor_channel)
+    # Hold the lock for every channel: a live message ingested between two scans would
+    # move the next channel's checkpoint past its backfill
+    async with scan_lock:
+        for monitor_channel in usable_channels:
+            await scan_channel_history(monitor_channel)
+
+def load_state():
+    """Rebuild the in-memory stats and index from the stored events and the hourly sketches"""
+    now = time.time()
+    event_store.prune(now - EVENT_RETENTION_SECONDS, now - SKETCH_RETENTION_HOURS * 3600)
+    rows = event_store.events_since(now - EVENT_RETENTION_SECONDS)
+    for message_id, channel_id, ts, field, value in rows:
+        index_event(ts, field, value)
+        if ts > now - BLOCK_WINDOW_SECONDS:
+            apply_event(channel_id, ts, field, value)
+    sketches = event_store.load_sketches(now - SKETCH_RETENTION_HOURS * 3600)
+    for hour, data in sketches:
+        block_sketches.load(hour, data)
+    print(f"Loaded {len(rows)} stored events and {len(sketches)} hourly sketches")
+
+def commit_events():
+    """Write pending events together with the sketches they changed"""
+    event_store.save_sketches(block_sketches.pop_dirty())
+    event_store.commit()
+
+def backfill_slices(start, end):
+    """(after, before) snowflake bounds that split [start, end) into BACKFILL_SLICE_SECONDS pieces
+
+    Bounds are message IDs rather than datetimes so that consecutive slices meet
+    exactly; the last slice is open-ended so it also picks up messages sent during the scan.
+    """
+    bounds = [discord.utils.time_snowflake(start)]
+    slice_start = start + timedelta(seconds=BACKFILL_SLICE_SECONDS)
+    while slice_start < end:
+        bounds.append(discord.utils.time_snowflake(slice_start))
+        slice_start += timedelta(seconds=BACKFILL_SLICE_SECONDS)
+    return [
+        (discord.Object(id=low - 1), discord.Object(id=high) if high else None)
+        for low, high in zip(bounds, bounds[1:] + [None])
+    ]
+
+async def fetch_slice(channel, after, before, semaphore):
+    """All messages of one slice, oldest first"""
+    async with semaphore:
+        # discord.py waits out 429s itself; the semaphore caps how many slices page at once
+        return [message async for message in channel.history(limit=None, after=after, before=before, oldest_first=True)]
 
 async def scan_channel_history(channel):
-    print(f"Scanning history for #{channel.name}...")
-    block_differences.clear()
-    channel_block_counts[channel.id] = 0
-    grpc_counts.clear()
-    grpc_counts.update({"In-House": 0, "Custom": 0})
-    
-    twenty_four_hours_ago = datetime.now() - timedelta(days=1)
+    """Backfill one channel; the caller holds scan_lock"""
+    # Resume after the last processed message if it is recent enough, else backfill bot_backfill_hours
+    now = datetime.now(timezone.utc)
+    hours = min(settings['bot_backfill_hours'], SKETCH_RETENTION_HOURS)
+    cutoff = now - timedelta(hours=hours)
+    checkpoint = event_store.checkpoint(channel.id)
+    if checkpoint and discord.utils.snowflake_time(checkpoint) > cutoff:
+        print(f"Scanning history for #{channel.name} after message {checkpoint}...")
+        slices = backfill_slices(discord.utils.snowflake_time(checkpoint), now)
+        slices[0] = (discord.Object(id=checkpoint), slices[0][1])
+        last_message_ids[channel.id] = max(last_message_ids.get(channel.id, 0), checkpoint)
+    else:
+        print(f"Scanning {hours:g}h of history for #{channel.name}...")
+        slices = backfill_slices(cutoff, now)
+    semaphore = asyncio.Semaphore(max(settings['bot_backfill_concurrency'], 1))
+    tasks = [asyncio.create_task(fetch_slice(channel, after, before, semaphore)) for after, before in slices]
     message_count = 0
+    started = time.monotonic()
     
     try:
-        async for message in channel.history(limit=None, after=twenty_four_hours_ago):
-            message_count += 1
-            if message.embeds:
-                for embed in message.embeds:
-                    for field in embed.fields:
-                        if field.name == "Block Difference":
-                            try:
-                                number = int(re.search(r'\d+', field.value).group())
-                                block_differences.append((message.created_at, number))
-                                channel_block_counts[channel.id] += 1
-                            except (AttributeError, ValueError) as e:
-                                print(f"Error parsing block difference: {e}")
-                                continue
-                        elif field.name == "GRPC":
-                            grpc_value = field.value.strip()
-                            if grpc_value in ["In-House", "Custom"]:
-                                grpc_counts[grpc_value] += 1
+        # Slices are fetched concurrently but ingested in order, so messages are counted oldest first
+        for number, task in enumerate(tasks, 1):
+            for message in await task:
+                message_count += 1
+                ingest_message(message)
+                if message_count % HISTORY_COMMIT_EVERY == 0:
+                    commit_events()
+            print(f"#{channel.name}: slice {number}/{len(tasks)} done, "
+                  f"{message_count} messages in {time.monotonic() - started:.1f}s")
+        commit_events()
         
         print(f"Scan complete. Processed {message_count} messages.")
-        print(f"Found {len(block_differences)} block differences")
-        print(f"GRPC counts: {grpc_counts}")
+        print(f"Found {len(block_stats)} block differences")
+        print(f"GRPC counts: {field_metrics.get(GRPC_FIELD).counts}")
         
-        await update_average_display()
+        stats_changed.set()
     except Exception as e:
+        for task in tasks:
+            task.cancel()
+        commit_events()
         print(f"Error during history scan: {e}")
 
+def parse_message(message):
+    """(field, value) pairs of the tracked fields of a Sharp message"""
+    # Block differences count blocks, so a sign in the text is not part of the value
+    return [(field, abs(int(value)) if field == BLOCK_FIELD else value)
+            for field, value in field_extractor.extract(message.embeds)]
+
+def apply_event(channel_id, ts, field, value):
+    """Fold one parsed field into the in-memory stats"""
+    if field == BLOCK_FIELD:
+        value = int(value)
+        block_stats.add(ts, value)
+        stats = channel_stats.get(channel_id)
+        if stats is None:
+            stats = channel_stats[channel_id] = RollingWindowStats(BLOCK_WINDOW_SECONDS)
+        stats.add(ts, value)
+    else:
+        field_metrics.add(ts, field, value)
+
+def index_event(ts, field, value):
+    """Record one parsed field in the time index"""
+    index = field_index.get(field)
+    if index is None:
+        index = field_index[field] = TimeIndex()
+    index.add(ts, int(value) if field == BLOCK_FIELD else value)
+
+def ingest_message(message):
+    """Count and store a Sharp message once; returns True if it had any stats fields"""
+    channel_id = message.channel.id
+    if message.id <= last_message_ids.get(channel_id, 0):
+        return False
+    last_message_ids[channel_id] = message.id
+    # Epoch seconds, so history (aware) and live times compare the same way
+    ts = message.created_at.timestamp()
+    events = parse_message(message)
+    now = time.time()
+    for field, value in events:
+        # A long backfill reaches past the rolling window and the index; only the sketches keep those
+        if ts > now - BLOCK_WINDOW_SECONDS:
+            apply_event(channel_id, ts, field, value)
+        if ts > now - EVENT_RETENTION_SECONDS:
+            index_event(ts, field, value)
+        if field == BLOCK_FIELD:
+            # Sketches are persisted themselves, so they are only fed new messages
+            block_sketches.add(ts, int(value))
+    event_store.add(message.id, channel_id, ts, events)
+    return bool(events)
+
+async def process_messages():
+    """Parse queued Sharp messages and flag the stats for republishing"""
+    while True:
+        message = await message_queue.get()
+        try:
+            async with scan_lock:
+                counted = ingest_message(message)
+                commit_events()
+            if counted:
+                stats_changed.set()
+        except Exception as e:
+            print(f"Error processing message: {e}")
+
+async def publish_stats():
+    """Publish the stats embed when it changed, at most once per bot_stats_update_seconds"""
+    last_published = 0.0
+    last_prune = time.monotonic()
+    while True:
+        try:
+            await asyncio.wait_for(stats_changed.wait(), timeout=STATS_REFRESH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        # Wait out the rest of the interval so a burst of messages becomes one edit
+        delay = settings['bot_stats_update_seconds'] - (time.monotonic() - last_published)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        stats_changed.clear()
+        try:
+            await update_average_display()
+        except Exception as e:
+            print(f"Error publishing stats: {e}")
+        last_published = time.monotonic()
+        if last_published - last_prune >= 3600:
+            block_sketches.expire(time.time())
+            for index in field_index.values():
+                index.expire(time.time() - EVENT_RETENTION_SECONDS)
+            event_store.prune(time.time() - EVENT_RETENTION_SECONDS, time.time() - SKETCH_RETENTION_HOURS * 3600)
+            last_prune = last_published
+
+def format_block_frequencies(frequencies, total):
+    """Embed lines for (block difference, count) pairs in ascending order"""
+    frequency_stats = ""
+    for diff, count in frequencies:
+        percentage = (count / total) * 100
+        frequency_stats += f"`{diff:2d}` blocks: **{count}** times ({percentage:.2f}%)\n"
+    return frequency_stats
+
+def format_grpc_counts(counts, total):
+    """Embed lines for the GRPC types, in their usual order"""
+    grpc_stats = ""
+    for grpc_type in BUILTIN_FIELDS[1].categories:
+        count = counts.get(grpc_type, 0)
+        percentage = (count / total * 100)
+        grpc_stats += f"{grpc_type}: **{count}** ({percentage:.2f}%)\n"
+    return grpc_stats
+
+def format_tracked_field(spec, aggregator):
+    """One summary line for a tracked field's rolling window, or None if it is empty"""
+    if not aggregator:
+        return None
+    if spec.kind == CATEGORICAL:
+        total = len(aggregator)
+        top = " · ".join(f"{category} {count / total * 100:.0f}%" for category, count in aggregator.most_common()[:3])
+        return f"{spec.name}: {top} ({total})"
+    if spec.kind == DURATION:
+        show = lambda seconds: f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.2f}s"
+    else:
+        show = lambda number: f"{number:.2f}"
+    return (f"{spec.name}: avg **{show(aggregator.mean())}** · p50 **{show(aggregator.quantile(0.5))}** "
+            f"· p90 **{show(aggregator.quantile(0.9))}** ({len(aggregator)})")
+
 async def update_average_display():
-    global last_update, update_queued, current_stats_message_id
+    global last_update, update_queued, current_stats_message_id, stats_message, last_stats_key, last_stats_edit
     
-    if not block_differences:
+    now = time.time()
+    block_stats.expire(now)
+    for stats in channel_stats.values():
+        stats.expire(now)
+    field_metrics.expire(now)
+    if not block_stats:
         return
     
-    block_frequencies.clear()
-    for _, diff in block_differences:
-        block_frequencies[diff] = block_frequencies.get(diff, 0) + 1
-    
     stats_channel = bot.get_channel(STATS_CHANNEL_ID)
     if stats_channel:
         current_time = datetime.now()
         berlin_time = datetime.now(berlin_tz)
-        total_occurrences = sum(block_frequencies.values())
+        total_occurrences = len(block_stats)
         
         # Check if it's time for a new message (same logic as before)
         should_create_new = False
-        if current_stats_message_id is None:
+        if stats_message is None and current_stats_message_id is not None:
+            try:
+                stats_message = await stats_channel.fetch_message(current_stats_message_id)
+            except discord.NotFound:
+                current_stats_message_id = None
+        if stats_message is None:
             should_create_new = True
-        else:
-            if berlin_time.hour == 16 and berlin_time.minute >= 15:
-                try:
-                    old_message = await stats_channel.fetch_message(current_stats_message_id)
-                    message_time = old_message.created_at.astimezone(berlin_tz)
-                    if message_time.date() < berlin_time.date():
-                        should_create_new = True
-                except discord.NotFound:
-                    should_create_new = True
+        elif berlin_time.hour == 16 and berlin_time.minute >= 15:
+            message_time = stats_message.created_at.astimezone(berlin_tz)
+            if message_time.date() < berlin_time.date():
+                should_create_new = True
 
         # Calculate statistics
-        block_numbers = [diff for _, diff in block_differences]
-        avg_blocks = round(mean(block_numbers), 2)
-        median_blocks = round(median(block_numbers), 2)
+        avg_blocks = round(block_stats.mean(), 2)
+        median_blocks = round(block_stats.median(), 2)
         
         # Create embed
         embed = discord.Embed(
@@ -176,83 +439,196 @@ async def update_average_display():
             inline=False
         )
         
-        # Add channel-specific counts
-        channel = bot.get_channel(MONITOR_CHANNEL_ID)
-        channel_name = channel.name if channel else f"Channel {MONITOR_CHANNEL_ID}"
-        channel_count = channel_block_counts[MONITOR_CHANNEL_ID]
-        channel_stats = f"#{channel_name}: **{channel_count}**\n"
+        # Add long-range percentiles from the hourly sketches
+        trend_stats = ""
+        for days, label in TREND_WINDOWS:
+            quantiles = block_sketches.quantiles(time.time() - days * 86400, time.time(), TREND_QUANTILES)
+            if quantiles:
+                p50, p90, p99 = (round(value, 1) for value in quantiles)
+                trend_stats += f"{label}: p50 **{p50}** · p90 **{p90}** · p99 **{p99}**\n"
+        if trend_stats:
+            embed.add_field(
+                name="📆 Long-Range Trends",
+                value=trend_stats,
+                inline=False
+            )
+        
+        # Add channel-specific counts, busiest channels first
+        channel_lines = []
+        for channel_id, stats in sorted(channel_stats.items(), key=lambda item: -len(item[1])):
+            if not stats:
+                continue
+            channel = bot.get_channel(channel_id)
+            channel_name = channel.name if channel else f"Channel {channel_id}"
+            channel_lines.append(
+                f"#{channel_name}: **{len(stats)}** · avg {round(stats.mean(), 2)} · median {round(stats.median(), 2)}"
+            )
+        channel_distribution = ""
+        for line in channel_lines:
+            if len(channel_distribution) + len(line) > 1000:  # Embed field values are capped at 1024
+                channel_distribution += "…\n"
+                break
+            channel_distribution += f"{line}\n"
         
         embed.add_field(
             name="📊 Channel Distribution",
-            value=channel_stats,
+            value=channel_distribution or "-",
             inline=False
         )
         
         # Add block frequency distribution
-        frequency_stats = ""
-        for diff in sorted(block_frequencies.keys()):
-            percentage = (block_frequencies[diff] / total_occurrences) * 100
-            frequency_stats += f"`{diff:2d}` blocks: **{block_frequencies[diff]}** times ({percentage:.2f}%)\n"
-        
         embed.add_field(
             name="🔢 Block Difference Distribution",
-            value=frequency_stats,
+            value=format_block_frequencies(block_stats.frequencies(), total_occurrences),
             inline=False
         )
         
         # Add GRPC distribution
-        total_grpc = sum(grpc_counts.values())
+        grpc_counter = field_metrics.get(GRPC_FIELD)
+        total_grpc = len(grpc_counter)
         if total_grpc > 0:
-            grpc_stats = ""
-            for grpc_type, count in grpc_counts.items():
-                percentage = (count / total_grpc * 100)
-                grpc_stats += f"{grpc_type}: **{count}** ({percentage:.2f}%)\n"
-            
             embed.add_field(
                 name="🔧 GRPC Distribution",
-                value=grpc_stats,
+                value=format_grpc_counts(grpc_counter.counts, total_grpc),
+                inline=False
+            )
+        
+        # Add any other tracked fields
+        tracked_stats = ""
+        for spec in field_specs:
+            if spec.name in (BLOCK_FIELD, GRPC_FIELD):
+                continue
+            line = format_tracked_field(spec, field_metrics.get(spec.name))
+            if line and len(tracked_stats) + len(line) <= 1000:
+                tracked_stats += f"{line}\n"
+        if tracked_stats:
+            embed.add_field(
+                name="🧩 Tracked Fields",
+                value=tracked_stats,
                 inline=False
             )
         
         # Add footer
         embed.set_footer(text="Stats auto-update every 24 hours at 16:15 Berlin time")
         
+        # Skip the edit if only the period moved and the last one is recent
+        stats_key = tuple(field.value for field in embed.fields[1:])
+        if (not should_create_new and stats_key == last_stats_key
+                and time.monotonic() - last_stats_edit < STATS_REFRESH_SECONDS):
+            return
+        
         try:
+            if not should_create_new:
+                try:
+                    await stats_message.edit(embed=embed)
+                except discord.NotFound:
+                    should_create_new = True
             if should_create_new:
-                new_message = await stats_channel.send(embed=embed)
-                current_stats_message_id = new_message.id
-            else:
-                message = await stats_channel.fetch_message(current_stats_message_id)
-                await message.edit(embed=embed)
+                stats_message = await stats_channel.send(embed=embed)
+                current_stats_message_id = stats_message.id
+            last_stats_key = stats_key
+            last_stats_edit = time.monotonic()
         except discord.HTTPException as e:
             print(f"Error handling stats message: {e}")
 
+def parse_window(window):
+    """Seconds in a window such as '90m', '6h' or '7d'"""
+    seconds = parse_duration(window)
+    if seconds <= 0:
+        raise ValueError(f"Empty window {window!r}")
+    return seconds
+
+def window_quantile(sorted_values, q):
+    """q-quantile of sorted values by the same rank rule as the sketches"""
+    return sorted_values[int(q * (len(sorted_values) - 1))]
+
+def block_window_embed(window, seconds, now):
+    """Block difference stats of the last seconds: exact from the index, approximate from the sketches past it"""
+    embed = discord.Embed(
+        title=f"📊 Block Difference Statistics ({window})",
+        color=discord.Color.blue(),
+        timestamp=datetime.now()
+    )
+    if seconds <= EVENT_RETENTION_SECONDS:
+        index = field_index.get(BLOCK_FIELD)
+        values = sorted(index.between(now - seconds)) if index else []
+        if not values:
+            embed.description = "No block differences in this window"
+            return embed
+        p90, p99 = (window_quantile(values, q) for q in TREND_QUANTILES[1:])
+        embed.add_field(
+            name="📈 Key Metrics",
+            value=(f"Messages: **{len(values)}**\n"
+                   f"Average: **{round(sum(values) / len(values), 2)}** blocks\n"
+                   f"Median: **{round(statistics.median(values), 2)}** blocks\n"
+                   f"p90: **{p90}** · p99: **{p99}**"),
+            inline=False
+        )
+        frequencies = sorted(Counter(values).items())
+        embed.add_field(
+            name="🔢 Block Difference Distribution",
+            value=format_block_frequencies(frequencies, len(values))[:1024],
+            inline=False
+        )
+        return embed
+    sketch = block_sketches.merged(now - seconds, now)
+    if not sketch.count:
+        embed.description = "No block differences in this window"
+        return embed
+    p50, p90, p99 = (round(sketch.quantile(q), 1) for q in TREND_QUANTILES)
+    embed.add_field(
+        name="📆 Key Metrics (hourly, ±1%)",
+        value=f"Messages: **{sketch.count}**\np50 **{p50}** · p90 **{p90}** · p99 **{p99}**",
+        inline=False
+    )
+    return embed
+
+@bot.tree.command(name="blocks", description="Block difference stats for a time window")
+@app_commands.describe(window="How far back to look, e.g. 1h, 6h, 7d or 30d")
+async def blocks_command(interaction: discord.Interaction, window: str = "24h"):
+    try:
+        seconds = parse_window(window)
+    except ValueError as e:
+        await interaction.response.send_message(f"Invalid window `{window}` ({e}), use e.g. 6h or 7d", ephemeral=True)
+        return
+    if seconds > SKETCH_RETENTION_HOURS * 3600:
+        await interaction.response.send_message(
+            f"Block differences are kept for {SKETCH_RETENTION_HOURS // 24} days", ephemeral=True
+        )
+        return
+    await interaction.response.send_message(embed=block_window_embed(window, seconds, time.time()))
+
+@bot.tree.command(name="grpc", description="GRPC type distribution for a time window")
+@app_commands.describe(window="How far back to look, e.g. 30m, 1h or 24h")
+async def grpc_command(interaction: discord.Interaction, window: str = "24h"):
+    try:
+        seconds = parse_window(window)
+    except ValueError as e:
+        await interaction.response.send_message(f"Invalid window `{window}` ({e}), use e.g. 1h or 24h", ephemeral=True)
+        return
+    if seconds > EVENT_RETENTION_SECONDS:
+        await interaction.response.send_message(
+            f"GRPC types are kept for {EVENT_RETENTION_SECONDS // 3600} hours", ephemeral=True
+        )
+        return
+    index = field_index.get(GRPC_FIELD)
+    counts = Counter(index.between(time.time() - seconds)) if index else Counter()
+    embed = discord.Embed(
+        title=f"🔧 GRPC Distribution ({window})",
+        color=discord.Color.blue(),
+        timestamp=datetime.now()
+    )
+    total = sum(counts.values())
+    if total:
+        embed.description = format_grpc_counts(counts, total)
+    else:
+        embed.description = "No GRPC types in this window"
+    await interaction.response.send_message(embed=embed)
+
 @bot.event
 async def on_message(message):
-    if message.channel.id == MONITOR_CHANNEL_ID and message.embeds:  # Changed from 'in' to '=='
-        for embed in message.embeds:
-            for field in embed.fields:
-                if field.name == "Block Difference":
-                    try:
-                        current_time = datetime.now()
-                        twenty_four_hours_ago = current_time - timedelta(days=1)
-                        
-                        global block_differences
-                        block_differences = [(time, diff) for time, diff in block_differences if time > twenty_four_hours_ago]
-                        
-                        number = int(re.search(r'\d+', field.value).group())
-                        block_differences.append((current_time, number))
-                        channel_block_counts[message.channel.id] += 1
-                    except (AttributeError, ValueError):
-                        continue
-                
-                # Check for GRPC
-                elif field.name == "GRPC":
-                    grpc_value = field.value.strip()
-                    if grpc_value in ["In-House", "Custom"]:
-                        grpc_counts[grpc_value] += 1
-            
-            # Update display after processing all fields
-            await update_average_display()
+    if message.channel.id in MONITOR_CHANNEL_IDS and message.embeds:
+        # Parsing and publishing happen in the background tasks
+        message_queue.put_nowait(message)
 
-    await bot.process_commands(message)
\ No newline at end of file
+    await bot.process_commands(message)
@@ -0,0 +1,271 @@
+"""Benchmark of the bot's message path with a synthetic Sharp stream and a mocked Discord client
+
+Feeds fake webhook messages through bot.on_message at a fixed rate and reports
+per-message latency (on_message until the message is counted), CPU time per
+1k messages, memory growth, stats renders and the Discord REST calls the stats
+embed would have made. Nothing is sent to Discord, and the bot is imported
+with its event store pointed at a temporary database.
+
+    python Monitor/bot_benchmark.py --messages 5000 --rate 500 --output bench.json
+    python Monitor/bot_benchmark.py --messages 5000 --rate 500 --baseline bench.json
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import discord
+
+try:
+    import resource  # Unix only; without it memory growth needs --tracemalloc
+except ImportError:
+    resource = None
+
+try:
+    from . import event_store
+    BOT_MODULE = __package__ + ".bot"
+except ImportError:
+    import event_store
+    BOT_MODULE = "bot"
+
+STATS_CHANNEL_ID = 2
+FIRST_MONITOR_CHANNEL_ID = 100
+
+# Metrics where a higher value is a regression, compared against --baseline
+LOWER_IS_BETTER = (
+    "latency_p50_ms", "latency_p99_ms", "latency_max_ms", "cpu_ms_per_1k",
+    "memory_growth_kb", "render_mean_ms", "render_max_ms", "rest_calls",
+)
+
+
+class FakeField:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+class FakeEmbed:
+    def __init__(self, fields):
+        self.fields = fields
+
+
+class FakeChannel:
+    """Channel that counts the REST calls made against it instead of making them"""
+
+    def __init__(self, channel_id, name, rest_latency):
+        self.id = channel_id
+        self.name = name
+        self.rest_latency = rest_latency
+        self.calls = {"send": 0, "edit": 0, "fetch": 0}
+
+    async def send(self, embed):
+        self.calls["send"] += 1
+        await asyncio.sleep(self.rest_latency)
+        return FakeMessage(self, [], datetime.now(timezone.utc))
+
+    async def fetch_message(self, message_id):
+        self.calls["fetch"] += 1
+        await asyncio.sleep(self.rest_latency)
+        raise discord.NotFound(FakeResponse(), "Unknown Message")
+
+
+class FakeResponse:
+    status = 404
+    reason = "Not Found"
+
+
+_message_ids = itertools.count(1)
+
+
+class FakeMessage:
+    def __init__(self, channel, embeds, created_at):
+        self.id = discord.utils.time_snowflake(created_at) + next(_message_ids) % 4096
+        self.channel = channel
+        self.embeds = embeds
+        self.created_at = created_at
+
+    async def edit(self, embed):
+        self.channel.calls["edit"] += 1
+        await asyncio.sleep(self.channel.rest_latency)
+
+
+def synthetic_embed(rng):
+    """Fields shaped like a Sharp webhook embed, with a skewed block difference"""
+    block_difference = min(int(rng.expovariate(0.4)), 40)
+    grpc = "In-House" if rng.random() < 0.7 else "Custom"
+    return FakeEmbed([
+        FakeField("Token", "So11111111111111111111111111111111111111112"),
+        FakeField("Block Difference", f"{block_difference} blocks"),
+        FakeField("GRPC", grpc),
+    ])
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+
+
+async def run(bot, args):
+    rng = random.Random(args.seed)
+    stats_channel = FakeChannel(STATS_CHANNEL_ID, "stats", args.rest_latency)
+    channels = [
+        FakeChannel(FIRST_MONITOR_CHANNEL_ID + i, f"sharp-{i}", args.rest_latency) for i in range(args.channels)
+    ]
+    by_id = {channel.id: channel for channel in [stats_channel] + channels}
+    bot.bot.get_channel = by_id.get
+    bot.bot.process_commands = lambda message: asyncio.sleep(0)
+    bot.MONITOR_CHANNEL_IDS = list(by_id)[1:]
+    bot.STATS_CHANNEL_ID = STATS_CHANNEL_ID
+    bot.settings = dict(bot.settings, bot_stats_update_seconds=args.update_seconds)
+
+    # Time each message from on_message until it has been counted, and each stats render
+    sent_at = {}
+    latencies = []
+    ingest_message = bot.ingest_message
+
+    def timed_ingest(message):
+        counted = ingest_message(message)
+        latencies.append(time.perf_counter() - sent_at.pop(message.id))
+        return counted
+
+    bot.ingest_message = timed_ingest
+    renders = []
+    update_average_display = bot.update_average_display
+
+    async def timed_update():
+        started = time.perf_counter()
+        await update_average_display()
+        renders.append(time.perf_counter() - started)
+
+    bot.update_average_display = timed_update
+
+    tasks = [asyncio.create_task(bot.process_messages()), asyncio.create_task(bot.publish_stats())]
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    memory_before = max_rss_kb()
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    for i in range(args.messages):
+        message = FakeMessage(channels[i % len(channels)], [synthetic_embed(rng)], datetime.now(timezone.utc))
+        sent_at[message.id] = time.perf_counter()
+        await bot.on_message(message)
+        # Sleep to the schedule rather than a fixed gap, so slow iterations don't lower the rate
+        delay = started + (i + 1) * interval - time.perf_counter()
+        await asyncio.sleep(max(delay, 0))
+    while len(latencies) < args.messages:
+        await asyncio.sleep(0.001)
+    feed_seconds = time.perf_counter() - started
+    cpu_seconds = time.process_time() - cpu_before
+    # Let the debounced publisher flush the last change
+    await asyncio.sleep(args.update_seconds + 0.1 + 3 * args.rest_latency)
+    if args.tracemalloc:
+        memory_growth_kb = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+    elif memory_before is not None:
+        memory_growth_kb = max_rss_kb() - memory_before
+    else:
+        memory_growth_kb = None
+
+    for task in tasks:
+        task.cancel()
+
+    latencies.sort()
+    calls = stats_channel.calls
+    return {
+        "params": {
+            "messages": args.messages,
+            "rate": args.rate,
+            "channels": args.channels,
+            "update_seconds": args.update_seconds,
+            "rest_latency": args.rest_latency,
+            "seed": args.seed,
+            "tracemalloc": args.tracemalloc,
+        },
+        "metrics": {
+            "throughput_per_s": round(args.messages / feed_seconds, 1),
+            "latency_p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+            "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "latency_max_ms": round(latencies[-1] * 1000, 3),
+            "cpu_ms_per_1k": round(cpu_seconds / args.messages * 1000 * 1000, 1),
+            "memory_growth_kb": round(memory_growth_kb, 1) if memory_growth_kb is not None else None,
+            "renders": len(renders),
+            "render_mean_ms": round(statistics.mean(renders) * 1000, 3) if renders else 0.0,
+            "render_max_ms": round(max(renders) * 1000, 3) if renders else 0.0,
+            "rest_calls": sum(calls.values()),
+            "rest_sends": calls["send"],
+            "rest_edits": calls["edit"],
+            "rest_fetches": calls["fetch"],
+        },
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Print current vs baseline metrics; returns the metrics that regressed by more than tolerance"""
+    if baseline["params"] != result["params"]:
+        print("Warning: baseline was run with different parameters:", baseline["params"])
+    regressions = []
+    print(f"{'metric':<20}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, value in result["metrics"].items():
+        old = baseline["metrics"].get(name)
+        if old is None or value is None:
+            continue
+        change = (value - old) / old * 100 if old else 0.0
+        flag = ""
+        if name in LOWER_IS_BETTER and value > old * (1 + tolerance) and value - old > 0.001:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<20}{old:>12}{value:>12}{change:>9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's message ingestion and stats publishing")
+    parser.add_argument("--messages", type=int, default=5000, help="Synthetic messages to feed")
+    parser.add_argument("--rate", type=float, default=500.0, help="Messages per second, 0 for as fast as possible")
+    parser.add_argument("--channels", type=int, default=2, help="Monitored channels to spread the messages over")
+    parser.add_argument("--update-seconds", type=float, default=1.0, help="bot_stats_update_seconds for the run")
+    parser.add_argument("--rest-latency", type=float, default=0.05, help="Seconds each mocked Discord REST call takes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Measure memory growth with tracemalloc (exact, but slows the run) instead of max RSS")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default: 0.2)")
+    args = parser.parse_args()
+
+    # The bot opens its event store on import, so point it at a scratch database first
+    with tempfile.TemporaryDirectory() as tmp:
+        event_store.DEFAULT_PATH = os.path.join(tmp, "bot_events.db")
+        bot = importlib.import_module(BOT_MODULE)
+        result = asyncio.run(run(bot, args))
+        bot.event_store.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+    elif not args.output:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
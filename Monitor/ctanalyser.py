@@ -7,18 +7,13 @@ import numpy as np
 import schedule
 import pytz
 from datetime import timedelta
-import json
 
-def load_settings():
-    """Load settings from settings.json"""
-    try:
-        settings_path = os.path.join(os.path.dirname(__file__), 'settings.json')
-        with open(settings_path, 'r') as f:
-            settings = json.load(f)
-        return settings
-    except Exception as e:
-        print(f"Error loading settings: {e}")
-        return {}
+try:
+    from .settings_store import get_settings
+    from .webhooks import send_webhook, REPORT
+except ImportError:
+    from settings_store import get_settings
+    from webhooks import send_webhook, REPORT
 
 def load_all_sessions():
     """Load all available session CSV files"""
@@ -87,32 +82,7 @@ def filter_data_by_timeframe(df, hours=None, days=None):
         
     return df[df['Date'] >= start_time]
 
-def send_webhook_with_retry(webhook, max_retries=5):
-    """Send webhook with retry logic for rate limits"""
-    for attempt in range(max_retries):
-        try:
-            response = webhook.execute()
-            if response and isinstance(response, list):
-                response = response[0]  # Get first response if multiple
-            
-            # If successful, return
-            if not response or response.status_code == 200:
-                return
-            
-            # Handle rate limiting
-            if response.status_code == 429:
-                retry_after = response.json().get('retry_after', 1)
-                print(f"Rate limited, waiting {retry_after} seconds...")
-                time.sleep(float(retry_after) + 0.1)  # Add small buffer
-                continue
-                
-        except Exception as e:
-            print(f"Webhook error: {str(e)}")
-            time.sleep(1)
-    
-    print("Max retries reached for webhook")
-
-def send_wallet_stats_to_discord(results_df, webhook_url, delay=1.5):
+def send_wallet_stats_to_discord(results_df, webhook_url):
     """Send individual wallet stats as separate embeds"""
     if results_df.empty:
         print("No wallet results to send.")
@@ -150,9 +120,8 @@ def send_wallet_stats_to_discord(results_df, webhook_url, delay=1.5):
         wallet_webhook = DiscordWebhook(url=webhook_url)
         wallet_webhook.add_embed(embed)
         
-        # Use new retry logic
-        send_webhook_with_retry(wallet_webhook)
-        time.sleep(delay)  # Increased default delay between messages
+        # Queued; the dispatcher paces sends by Discord's rate limit headers
+        send_webhook(wallet_webhook, REPORT)
 
 def send_ranking_csv_to_discord(results_dict, webhook_url):
     """Send overall ranking as a CSV file with all timeframes"""
@@ -221,9 +190,9 @@ def send_ranking_csv_to_discord(results_dict, webhook_url):
     with open(csv_filename, 'rb') as f:
         webhook.add_file(file=f.read(), filename=csv_filename)
     
-    send_webhook_with_retry(webhook)
+    send_webhook(webhook, REPORT)
     
-    # Clean up the file
+    # Clean up the file (the dispatcher already holds its contents)
     os.remove(csv_filename)
 
 def analyze_trades(df):
@@ -288,13 +257,11 @@ def send_timeframe_results_to_discord(df, webhook_url, timeframe_label):
         color=0x00ff00
     )
     webhook.add_embed(main_embed)
-    webhook.execute()
-    time.sleep(1)  # Prevent rate limiting
+    send_webhook(webhook, REPORT)
 
     # Send individual wallet stats
     for _, row in df.iterrows():
         send_wallet_stats_to_discord(pd.DataFrame([row]), webhook_url)
-        time.sleep(1)  # Prevent rate limiting
 
 def get_color_and_emoji_by_roi(roi):
     """Get color and emoji based on ROI performance"""
@@ -400,13 +367,12 @@ def send_combined_wallet_stats(results_dict, webhook_url, timeframe_type="All"):
                 )
             webhook.add_embed(timeframe_embed)
 
-        # Send webhook with retry logic
-        send_webhook_with_retry(webhook)
-        time.sleep(1.5)  # Increased delay between wallets
+        # Queued; the dispatcher retries and paces sends per webhook
+        send_webhook(webhook, REPORT)
 
 def run_analysis():
     """Main function to run the analysis"""
-    settings = load_settings()
+    settings = get_settings()
     if not settings:
         print("Failed to load settings. Exiting...")
         return
@@ -3,195 +3,64 @@ import requests
 from discord_webhook import DiscordWebhook, DiscordEmbed
 import datetime
 import pytz
-import json
 import os
 
-def load_settings():
-    """Load settings from settings.json"""
-    try:
-        settings_path = os.path.join(os.path.dirname(__file__), 'settings.json')
-        with open(settings_path, 'r') as f:
-            settings = json.load(f)
-        return settings
-    except Exception as e:
-        print(f"Error loading settings: {e}")
-        return {}
+try:
+    from .settings_store import get_settings
+    from .balance_history import BalanceHistory, DATA_DIR
+    from .rpc import RpcError, rpc_call, pool as rpc_pool
+    from .alerts import AlertEngine, RECOVER, RENOTIFY
+    from .txpnl import TransactionPnLTracker
+    from .rollups import BalanceRollups, ReportSchedule
+    from .webhooks import send_webhook, ALERT, REPORT
+    from .scheduler import RateLimiter
+    from .spl_token import (
+        WSOL_MINT, USDC_MINT, LAMPORTS_PER_SOL,
+        get_token_amount, get_wallets_balances, ui_amount
+    )
+except ImportError:
+    from settings_store import get_settings
+    from balance_history import BalanceHistory, DATA_DIR
+    from rpc import RpcError, rpc_call, pool as rpc_pool
+    from alerts import AlertEngine, RECOVER, RENOTIFY
+    from txpnl import TransactionPnLTracker
+    from rollups import BalanceRollups, ReportSchedule
+    from webhooks import send_webhook, ALERT, REPORT
+    from scheduler import RateLimiter
+    from spl_token import (
+        WSOL_MINT, USDC_MINT, LAMPORTS_PER_SOL,
+        get_token_amount, get_wallets_balances, ui_amount
+    )
+
+BALANCE_LOG_PATH = os.path.join(DATA_DIR, 'balance_history.bin')
+
+# Token balances read per wallet role; other mints are not shown for that role
+ROLE_MINTS = {'botting': [WSOL_MINT], 'vault': [USDC_MINT]}
+
+# Reuse the SOL price for this long so alerts and updates don't hammer CoinGecko
+PRICE_CACHE_SECONDS = 60
+REPORT_TOP_TOKENS = 5  # Tokens listed by realized PnL in the daily/weekly report
+_price_cache = {'price': None, 'time': 0.0}
 
 def get_balance(wallet_address, settings):
-    headers = {
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getBalance",
-        "params": [wallet_address]
-    }
-    
-    backoff_time = 1  # Start with 1 second backoff
-    max_retries = 5   # Maximum number of retries
-    max_backoff_time = 60  # Maximum backoff time in seconds
-    
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(settings['solana_rpc_url'], json=payload, headers=headers)
-            
-            # Check if response is valid
-            if not response.ok:
-                print(f"HTTP Error: {response.status_code} - {response.text}")
-                if attempt < max_retries - 1:
-                    wait_time = min(backoff_time * (2 ** attempt), max_backoff_time)
-                    print(f"Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                return 0.0
-            
-            # Try to parse JSON response
-            try:
-                result = response.json()
-            except ValueError as e:
-                print(f"Error parsing JSON response: {response.text[:100]}...")
-                if attempt < max_retries - 1:
-                    continue
-                return 0.0
-            
-            if 'result' in result and 'value' in result['result']:
-                balance_in_sol = result['result']['value'] / 1_000_000_000
-                return balance_in_sol
-            elif 'error' in result and result['error']['code'] == 429:
-                if attempt < max_retries - 1:
-                    wait_time = min(backoff_time * (2 ** attempt), max_backoff_time)
-                    print(f"Rate limit exceeded. Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-            else:
-                print(f"Error: Unexpected response format: {result}")
-                if attempt < max_retries - 1:
-                    continue
-                return 0.0
-                
-        except Exception as e:
-            print(f"Unexpected error: {str(e)}")
-            if attempt < max_retries - 1:
-                wait_time = min(backoff_time * (2 ** attempt), max_backoff_time)
-                print(f"Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                continue
-            return 0.0
-    
-    print("Max retries reached. Returning 0 balance.")
-    return 0.0
+    """SOL balance of a wallet; raises RpcError instead of reporting 0 on failure"""
+    return rpc_call("getBalance", [wallet_address], settings)['value'] / LAMPORTS_PER_SOL
 
 def get_wsol_balance(wallet_address):
-    settings = load_settings()
-    headers = {
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTokenAccountsByOwner",
-        "params": [
-            wallet_address,
-            {"mint": "So11111111111111111111111111111111111111112"},  # WSOL mint address
-            {"encoding": "jsonParsed"}
-        ]
-    }
-    
-    backoff_time = 1  # Start with 1 second backoff
-    max_retries = 5   # Maximum number of retries
-    max_backoff_time = 60  # Maximum backoff time
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(settings['solana_rpc_url'], json=payload, headers=headers)
-            
-            # Check if response is valid
-            if not response.ok:
-                print(f"HTTP Error: {response.status_code} - {response.text}")
-                if attempt < max_retries - 1:
-                    wait_time = min(backoff_time * (2 ** attempt), max_backoff_time)
-                    print(f"Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                return 0.0
-            
-            # Try to parse JSON response
-            try:
-                result = response.json()
-            except ValueError:
-                print(f"Error parsing JSON response: {response.text[:100]}...")
-                if attempt < max_retries - 1:
-                    continue
-                return 0.0
-
-            if 'result' in result and 'value' in result['result']:
-                accounts = result['result']['value']
-                if accounts:
-                    balance_in_wsol = int(accounts[0]['account']['data']['parsed']['info']['tokenAmount']['amount']) / 1_000_000_000
-                    return balance_in_wsol
-                return 0.0
-            elif 'error' in result and result['error']['code'] == 429:
-                wait_time = min(backoff_time * (2 ** attempt), max_backoff_time)
-                print(f"Rate limit exceeded. Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                continue
-            else:
-                print(f"Error: Unexpected response format: {result}")
-                if attempt < max_retries - 1:
-                    continue
-                return 0.0
-                
-        except Exception as e:
-            print(f"Unexpected error: {str(e)}")
-            if attempt < max_retries - 1:
-                wait_time = min(backoff_time * (2 ** attempt), max_backoff_time)
-                print(f"Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                continue
-            return 0.0
-    
-    print("Max retries reached. Returning 0 balance.")
-    return 0.0
+    """WSOL balance of a wallet; raises RpcError on failure"""
+    settings = get_settings()
+    return ui_amount(get_token_amount(wallet_address, WSOL_MINT, settings), WSOL_MINT)
 
 def get_usdc_balance(wallet_address):
-    settings = load_settings()
-    headers = {
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTokenAccountsByOwner",
-        "params": [
-            wallet_address,
-            {"mint": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"},  # USDC mint address
-            {"encoding": "jsonParsed"}
-        ]
-    }
-    response = requests.post(settings['solana_rpc_url'], json=payload, headers=headers)
-    
-    try:
-        result = response.json()
-    except ValueError:
-        print("Error: Unable to parse JSON response.")
-        return 0.0
-
-    if 'result' in result and 'value' in result['result']:
-        accounts = result['result']['value']
-        if accounts:
-            # Assuming the first account is the USDC account
-            balance_in_usdc = int(accounts[0]['account']['data']['parsed']['info']['tokenAmount']['amount']) / 1_000_000
-        else:
-            balance_in_usdc = 0.0
-    else:
-        print("Error: Unexpected response format or no USDC accounts found.")
-        balance_in_usdc = 0.0
-
-    return balance_in_usdc
+    """USDC balance of a wallet; raises RpcError on failure"""
+    settings = get_settings()
+    return ui_amount(get_token_amount(wallet_address, USDC_MINT, settings), USDC_MINT)
 
 def get_solana_price():
-    """Get current Solana price in USD from CoinGecko"""
+    """Get current Solana price in USD from CoinGecko, cached for PRICE_CACHE_SECONDS"""
+    now = time.time()
+    if _price_cache['price'] is not None and now - _price_cache['time'] < PRICE_CACHE_SECONDS:
+        return _price_cache['price']
     try:
         url = "https://api.coingecko.com/api/v3/simple/price"
         params = {
@@ -200,14 +69,37 @@ def get_solana_price():
         }
         response = requests.get(url, params=params)
         data = response.json()
-        return data["solana"]["usd"]
+        _price_cache.update(price=data["solana"]["usd"], time=now)
+        return _price_cache['price']
     except Exception as e:
         print(f"Error fetching Solana price: {e}")
         return None
 
-def send_discord_alert(sol_balance, wsol_balance, daily_pnl):
-    """Send low balance alert with USD values"""
-    settings = load_settings()
+def configure_alert_engine(engine, settings):
+    """Apply the low balance alert settings to an AlertEngine"""
+    trigger = settings['your_balance_threshold']
+    engine.configure(
+        trigger=trigger,
+        clear=settings['your_balance_clear_threshold'] or trigger * 1.05,
+        renotify_intervals=[minutes * 60 for minutes in settings['balance_alert_renotify_minutes']],
+        escalate_after=settings['balance_alert_escalate_after'],
+        max_notifications=settings['balance_alert_max_notifications'],
+        cooldown=settings['balance_alert_cooldown_minutes'] * 60,
+    )
+    return engine
+
+def send_discord_alert(sol_balance, wsol_balance, daily_pnl, event=None):
+    """Send low balance alert (or recovery notice) with USD values"""
+    settings = get_settings()
+
+    if event is not None and event.kind == RECOVER:
+        embed = DiscordEmbed(title="✅ Balance Recovered", color='00ff00')
+        embed.set_description(f"Balance is back above threshold after {event.notification} alert(s).")
+        embed.add_embed_field(name="Total", value=f"{event.value:.2f} SOL", inline=False)
+        webhook = DiscordWebhook(url=settings['balance_10min_webhook'])
+        webhook.add_embed(embed)
+        send_webhook(webhook, ALERT)
+        return
     total_balance = sol_balance + wsol_balance
     
     # Get Solana price
@@ -222,7 +114,12 @@ def send_discord_alert(sol_balance, wsol_balance, daily_pnl):
         total_usd = 0
         daily_pnl_usd = 0
     
-    embed = DiscordEmbed(title="⚠️ Low Balance Alert", color='ff0000')
+    title = "⚠️ Low Balance Alert"
+    if event is not None and event.escalated:
+        title = "🚨 Low Balance Alert (Escalated)"
+    if event is not None and event.kind == RENOTIFY:
+        title += f" - Reminder #{event.notification - 1}"
+    embed = DiscordEmbed(title=title, color='ff0000')
     embed.set_description(f"<@{settings['discord_id']}> Warning: Balance is below threshold!")
     
     embed.add_embed_field(
@@ -249,52 +146,55 @@ def send_discord_alert(sol_balance, wsol_balance, daily_pnl):
     # Add SOL price
     embed.add_embed_field(name="SOL Price", value=f"${sol_price:,.2f}", inline=False)
     
-    webhook = DiscordWebhook(url=settings['balance_10min_webhook'])
+    # Mentions inside embeds don't notify, so escalated alerts ping in the message content
+    content = f"<@{settings['discord_id']}>" if event is not None and event.escalated else None
+    webhook = DiscordWebhook(url=settings['balance_10min_webhook'], content=content)
     webhook.add_embed(embed)
-    webhook.execute()
+    send_webhook(webhook, ALERT)
 
-def send_discord_balance_and_pnl(sol_balance, wsol_balance, vault_sol_balance, vault_usdc_balance, daily_pnl):
-    """Send balance update to Discord with daily PnL and USD values"""
-    settings = load_settings()
+def format_wallet_field(wallet, sol_price, daily_pnl, realized=None):
+    """Embed field text for one wallet of the portfolio"""
+    lines = [f"SOL: {wallet['sol']:.2f} (${wallet['sol'] * sol_price:,.2f})"]
+    if wallet['wsol']:
+        lines.append(f"WSOL: {wallet['wsol']:.2f} (${wallet['wsol'] * sol_price:,.2f})")
+    if wallet['usdc']:
+        lines.append(f"USDC: {wallet['usdc']:.2f}")
+    lines.append(f"Total Value: ${wallet['total'] * sol_price + wallet['usdc']:,.2f}")
+    lines.append(f"Daily PnL: {daily_pnl:+.2f} SOL")
+    if realized is not None:
+        realized_pnl, transactions = realized
+        lines.append(f"Realized PnL: {realized_pnl:+.3f} SOL ({transactions} tx)")
+    return "\n".join(lines)
+
+def send_discord_balance_and_pnl(snapshot, wallet_pnls, daily_pnl, realized_pnls=None):
+    """Send portfolio balance update to Discord with per-wallet and combined daily PnL"""
+    settings = get_settings()
     
     # Get Solana price
     sol_price = get_solana_price() or 0
     
-    # Calculate totals
-    bot_total_sol = sol_balance + wsol_balance
-    bot_total_usd = bot_total_sol * sol_price
-    vault_total_usd = (vault_sol_balance * sol_price) + vault_usdc_balance
-    combined_total_sol = bot_total_sol + vault_sol_balance
-    combined_total_usd = bot_total_usd + vault_total_usd
-    
     # Set color based on daily PnL
     color = '00ff00' if daily_pnl >= 0 else 'ff0000'
     
     embed = DiscordEmbed(title="Balance and PnL Update", color=color)
     
-    # Bot Wallet Section
-    embed.add_embed_field(
-        name="BOT WALLET",
-        value=f"SOL: {sol_balance:.2f} (${sol_balance * sol_price:,.2f})\n"
-              f"WSOL: {wsol_balance:.2f} (${wsol_balance * sol_price:,.2f})\n"
-              f"Total Value: ${bot_total_usd:,.2f}",
-        inline=False
-    )
-    
-    # Vault Wallet Section
-    embed.add_embed_field(
-        name="VAULT WALLET",
-        value=f"SOL: {vault_sol_balance:.2f} (${vault_sol_balance * sol_price:,.2f})\n"
-              f"USDC: {vault_usdc_balance:.2f}\n"
-              f"Total Value: ${vault_total_usd:,.2f}",
-        inline=False
-    )
+    # One section per wallet; Discord allows 25 fields, two are used below
+    for wallet in snapshot.wallets[:23]:
+        role = "BOT WALLET" if wallet['role'] == 'botting' else "VAULT WALLET"
+        embed.add_embed_field(
+            name=f"{role} ({wallet['label']})",
+            value=format_wallet_field(wallet, sol_price, wallet_pnls.get(wallet['address'], 0.0),
+                                      (realized_pnls or {}).get(wallet['address'])),
+            inline=False
+        )
     
     # Combined Section
+    combined_usdc = sum(wallet['usdc'] for wallet in snapshot.wallets)
     embed.add_embed_field(
         name="COMBINED",
-        value=f"Total SOL: {combined_total_sol:.2f}\n"
-              f"Total Value: ${combined_total_usd:,.2f}",
+        value=f"Total SOL: {snapshot.total:.2f}\n"
+              f"Total Value: ${snapshot.total * sol_price + combined_usdc:,.2f}\n"
+              f"Daily PnL: {daily_pnl:+.2f} SOL",
         inline=False
     )
     
@@ -311,124 +211,308 @@ def send_discord_balance_and_pnl(sol_balance, wsol_balance, vault_sol_balance, v
     
     webhook = DiscordWebhook(url=settings['balance_10min_webhook'])
     webhook.add_embed(embed)
-    webhook.execute()
+    send_webhook(webhook, REPORT)
 
-def send_daily_balance_and_pnl(sol_balance, wsol_balance, total_pnl):
-    settings = load_settings()
-    total_balance = sol_balance + wsol_balance
-    embed = DiscordEmbed(title="Daily Balance and PnL Update", color='03b2f8')
-    embed.add_embed_field(name="SOL", value=f"{sol_balance} SOL", inline=True)
-    embed.add_embed_field(name="WSOL", value=f"{wsol_balance} WSOL", inline=True)
-    embed.add_embed_field(name="Total Balance", value=f"{total_balance} SOL", inline=False)
-    embed.add_embed_field(name="12h Realized PnL", value=f"{total_pnl} SOL", inline=False)
+def format_token_pnl(token_pnls):
+    """Embed field text for the tokens with the largest realized PnL, biggest moves first"""
+    top = sorted(token_pnls.items(), key=lambda item: (-abs(item[1]), item[0]))[:REPORT_TOP_TOKENS]
+    lines = [f"{mint if mint == 'SOL' else mint[:8]}: {pnl:+.3f} SOL" for mint, pnl in top]
+    if len(token_pnls) > len(top):
+        lines.append(f"... and {len(token_pnls) - len(top)} more")
+    return "\n".join(lines)
+
+def send_daily_balance_and_pnl(kind, report, realized_pnl=None, token_pnls=None):
+    """Send a daily or weekly balance report built from the persisted rollups"""
+    settings = get_settings()
+    if report['first_day'] == report['last_day']:
+        period = report['first_day'].isoformat()
+    else:
+        period = f"{report['first_day'].isoformat()} - {report['last_day'].isoformat()}"
+    embed = DiscordEmbed(title=f"{kind.capitalize()} Balance and PnL Update", color='03b2f8')
+    embed.set_description(f"Period: {period} (UTC)")
+    embed.add_embed_field(name="Open", value=f"{report['open']:.2f} SOL", inline=True)
+    embed.add_embed_field(name="Close", value=f"{report['close']:.2f} SOL", inline=True)
+    embed.add_embed_field(name="Low / High", value=f"{report['min']:.2f} / {report['max']:.2f} SOL", inline=True)
+    embed.add_embed_field(name="Balance PnL", value=f"{report['pnl']:+.2f} SOL", inline=False)
+    if realized_pnl is not None:
+        embed.add_embed_field(name="Realized PnL (excl. vault transfers)", value=f"{realized_pnl:+.3f} SOL", inline=False)
+    if token_pnls:
+        embed.add_embed_field(name="Realized PnL by Token", value=format_token_pnl(token_pnls), inline=False)
     webhook = DiscordWebhook(url=settings['balance_daily_webhook'])
     webhook.add_embed(embed)
-    webhook.execute()
+    send_webhook(webhook, REPORT)
+
+def send_scheduled_reports(rollups, schedule, tx_trackers):
+    """Send any daily/weekly report that is due; returns how many were sent"""
+    sent = 0
+    for kind, first_day in schedule.due():
+        if kind == "daily":
+            report = rollups.daily_report(first_day)
+            days = [first_day]
+        else:
+            report = rollups.weekly_report(first_day)
+            days = [first_day + datetime.timedelta(days=i) for i in range(7)]
+        if report is not None:
+            realized = None
+            token_pnls = {}
+            if tx_trackers:
+                realized = sum(tracker.daily_pnl(day.isoformat()) for tracker in tx_trackers.values() for day in days)
+                for tracker in tx_trackers.values():
+                    for day in days:
+                        for mint, pnl in tracker.token_pnl(day.isoformat()).items():
+                            token_pnls[mint] = token_pnls.get(mint, 0.0) + pnl
+            print(f"Sending {kind} balance report for {first_day}...")
+            send_daily_balance_and_pnl(kind, report, realized, token_pnls)
+            sent += 1
+        # Periods without data are marked too, so they are not retried every loop
+        schedule.mark_sent(kind, first_day)
+    return sent
 
 class DailyPnLTracker:
-    def __init__(self):
-        self.reset_time = None
-        self.starting_balance = None
-        self.trades = []
+    def __init__(self, log_path=BALANCE_LOG_PATH, label="Total"):
+        # Bounded ring of samples; the full series is kept in the binary log on disk
+        self.history = BalanceHistory(log_path=log_path)
+        self.label = label
         
     def update(self, current_total):
-        current_time = datetime.datetime.now(pytz.UTC)
-        
         # Reset at midnight UTC
-        if (self.reset_time is None or 
-            current_time.date() > self.reset_time.date()):
-            self.reset_time = current_time
-            self.starting_balance = current_total
-            self.trades = []
-            print(f"Daily PnL tracker reset. Starting balance: {self.starting_balance:.2f} SOL")
-            
-        # Record the current balance
-        self.trades.append({
-            'timestamp': current_time,
-            'balance': current_total
-        })
+        if self.history.append(current_total):
+            print(f"Daily PnL tracker reset ({self.label}). Starting balance: {current_total:.2f} SOL")
         
     def get_daily_pnl(self):
-        if not self.starting_balance:
-            return 0.0
-        
-        if not self.trades:
-            return 0.0
-            
-        current_balance = self.trades[-1]['balance']
-        daily_pnl = current_balance - self.starting_balance
-        return daily_pnl
+        return self.history.daily_pnl()
+
+    def get_max_drawdown(self):
+        return self.history.max_drawdown()
+
+    def get_delta(self, minutes):
+        return self.history.delta(minutes)
+
+def get_monitored_wallets(settings):
+    """Botting and vault wallets to monitor, each with a label, address and role"""
+    wallets = []
+    seen = set()
+    for role, address_key, list_key, default_label in [
+        ('botting', 'botting_address', 'botting_wallets', "Active"),
+        ('vault', 'vault_address', 'vault_wallets', "Vault"),
+    ]:
+        entries = list(settings[list_key])
+        if settings.get(address_key):
+            entries.insert(0, {"label": default_label, "address": settings[address_key]})
+        for entry in entries:
+            if entry['address'] in seen:
+                continue
+            seen.add(entry['address'])
+            wallets.append({"label": entry['label'], "address": entry['address'], "role": role})
+    return wallets
+
+def update_transaction_trackers(trackers, wallets, settings):
+    """Poll the signature cursor of every botting wallet; returns address -> (realized PnL, tx count)"""
+    vaults = [wallet['address'] for wallet in wallets if wallet['role'] == 'vault']
+    realized = {}
+    for wallet in wallets:
+        if wallet['role'] != 'botting':
+            continue
+        tracker = trackers.get(wallet['address'])
+        if tracker is None:
+            tracker = trackers[wallet['address']] = TransactionPnLTracker(wallet['address'])
+        # Transfers to and from any vault are deposits/withdrawals, not trading PnL
+        tracker.set_excluded_addresses(vaults)
+        try:
+            count = tracker.poll(settings)
+            if count:
+                print(f"Processed {count} new transactions for {wallet['label']}")
+        except RpcError as e:
+            print(f"Error polling transactions for {wallet['label']}: {e}")
+        realized[wallet['address']] = (tracker.daily_pnl(), tracker.daily_transactions())
+    return realized
+
+def pnl_log_path(address):
+    """Per-wallet balance log file, named after the wallet address since labels need not be unique"""
+    return os.path.join(DATA_DIR, f"balance_history_{address[:8]}.bin")
+
+class BalanceSnapshot:
+    """Raw balances of every monitored wallet as of an RPC context slot"""
+
+    def __init__(self, wallets, balances):
+        self.slot = min(balance['slot'] for balance in balances)
+        # Mints a wallet's role doesn't read, or without a token account, count as zero
+        tokens = [
+            (balance['tokens'].get(WSOL_MINT) or 0, balance['tokens'].get(USDC_MINT) or 0) for balance in balances
+        ]
+        self.amounts = tuple(
+            (wallet['address'], balance['lamports'], wsol, usdc)
+            for wallet, balance, (wsol, usdc) in zip(wallets, balances, tokens)
+        )
+        self.day = datetime.datetime.now(pytz.UTC).date()
+        self.wallets = []
+        for wallet, balance, (wsol, usdc) in zip(wallets, balances, tokens):
+            sol = balance['lamports'] / LAMPORTS_PER_SOL
+            wsol = ui_amount(wsol, WSOL_MINT)
+            self.wallets.append(dict(
+                wallet,
+                sol=sol,
+                wsol=wsol,
+                usdc=ui_amount(usdc, USDC_MINT),
+                total=sol + wsol,
+            ))
+        # Total SOL balance across all wallets (including vaults)
+        self.total = sum(wallet['total'] for wallet in self.wallets)
+        self.botting_sol = sum(w['sol'] for w in self.wallets if w['role'] == 'botting')
+        self.botting_wsol = sum(w['wsol'] for w in self.wallets if w['role'] == 'botting')
+
+    def is_stale(self, previous):
+        """True if this snapshot was served from an older slot than the previous one"""
+        return previous is not None and self.slot < previous.slot
+
+    def has_changed(self, previous):
+        """True if any balance moved, the wallet set changed, or a new UTC day started"""
+        return previous is None or self.amounts != previous.amounts or self.day != previous.day
+
+def print_pipeline_stats(stage_counts):
+    """Print how often each pipeline stage ran versus was skipped"""
+    fetched = stage_counts['fetch']
+    print(f"Pipeline: {fetched} fetches ({stage_counts['requests']} requests), "
+          f"{stage_counts['stale']} stale, "
+          f"{stage_counts['unchanged']} unchanged, "
+          f"PnL {stage_counts['pnl']}/{fetched}, "
+          f"alerts {stage_counts['alert']}, "
+          f"updates {stage_counts['update']}, "
+          f"reports {stage_counts['report']}")
+    if len(rpc_pool.endpoints) > 1:
+        for line in rpc_pool.status():
+            print(f"RPC {line}")
 
 def monitor_balance():
     """Main balance monitoring function"""
-    settings = load_settings()
+    settings = get_settings()
     if not settings:
         print("Failed to load settings. Exiting...")
         return
 
     print("\nStarting balance monitoring...")
     
-    # Initialize PnL tracker
+    # Initialize PnL trackers: one for the whole portfolio plus one per wallet address
     pnl_tracker = DailyPnLTracker()
+    wallet_trackers = {}
+    # Transaction-level realized PnL per botting wallet, excluding vault transfers
+    tx_trackers = {}
+    realized_pnls = {}
+    # Minute/hour/day rollups on disk feed the daily and weekly reports
+    rollups = BalanceRollups()
+    report_schedule = ReportSchedule()
+
+    # Low balance alert state machine; bounds notifications per incident
+    alert_engine = configure_alert_engine(AlertEngine("balance", 0.0), settings)
     
-    # Get wallet addresses from settings
-    active_wallet_address = settings.get('botting_address')
-    vault_wallet_address = settings.get('vault_address')
-    
-    if not active_wallet_address or not vault_wallet_address:
+    # Get wallets from settings
+    if not get_monitored_wallets(settings):
         print("Error: Missing wallet addresses in settings")
         return
 
     last_update_time = None  # Add this line to track last webhook send
+    previous = None  # Last snapshot that went through the pipeline
+    last_reported = None  # Snapshot used for the last regular update
+    daily_pnl = 0.0
+    wallet_pnls = {}
+
+    # Counts the RPC requests of the balance fetch; it sets no rate
+    fetch_requests = RateLimiter()
+
+    # How many times each stage ran, to show how much work change-gating saves
+    stage_counts = dict.fromkeys(['fetch', 'requests', 'stale', 'unchanged', 'pnl', 'alert', 'update', 'report'], 0)
 
     while True:
         try:
-            # Get SOL balances
-            print("\n=== Fetching New Balances ===")
-            print("Fetching Active Wallet SOL...")
-            active_sol = get_balance(active_wallet_address, settings)
-            time.sleep(2)
-            
-            print("Fetching Active Wallet WSOL...")
-            active_wsol = get_wsol_balance(active_wallet_address)
-            time.sleep(2)
-            
-            print("Fetching Vault Wallet SOL...")
-            vault_sol = get_balance(vault_wallet_address, settings)
-            time.sleep(2)
-            
-            print("Fetching Vault Wallet USDC...")
-            vault_usdc = get_usdc_balance(vault_wallet_address)
-            
-            # Calculate total balance (including vault)
-            total_balance = active_sol + active_wsol + vault_sol
-            
-            # Update PnL tracker
-            pnl_tracker.update(total_balance)
-            daily_pnl = pnl_tracker.get_daily_pnl()
-            
-            # Low balance alert (if below threshold)
-            if total_balance < settings.get('your_balance_threshold', 0):
-                print("Sending low balance alert...")  # Add debug print
-                send_discord_alert(active_sol, active_wsol, daily_pnl)
-            
-            # Regular update every 10 minutes
+            # Cached settings; picks up edits to settings.json without re-reading it every loop
+            settings = get_settings()
+            wallets = get_monitored_wallets(settings)
+            if not wallets:
+                print("Error: Missing wallet addresses in settings")
+                time.sleep(30)
+                continue
+
+            # Stage 1: fetch SOL and the role's token of every wallet with batched getMultipleAccounts;
+            # a missing token account just means zero, so no getTokenAccountsByOwner scans
+            print(f"\n=== Fetching New Balances ({len(wallets)} wallets) ===")
+            acquired = fetch_requests.acquired
+            balances = get_wallets_balances(
+                [(wallet['address'], ROLE_MINTS[wallet['role']]) for wallet in wallets], settings,
+                scan_missing=False, limiter=fetch_requests
+            )
+            snapshot = BalanceSnapshot(wallets, balances)
+            stage_counts['fetch'] += 1
+            stage_counts['requests'] += fetch_requests.acquired - acquired
+
+            # Stage 2: gate on change; later stages only run if something moved
+            if snapshot.is_stale(previous):
+                stage_counts['stale'] += 1
+                print(f"Ignoring stale response from slot {snapshot.slot} (have {previous.slot})")
+            elif not snapshot.has_changed(previous):
+                stage_counts['unchanged'] += 1
+                previous = snapshot
+                print(f"No balance change at slot {snapshot.slot} (total {snapshot.total:.2f} SOL)")
+            else:
+                previous = snapshot
+
+                # Stage 3: update PnL trackers
+                pnl_tracker.update(snapshot.total)
+                rollups.update(snapshot.total)
+                daily_pnl = pnl_tracker.get_daily_pnl()
+                for wallet in snapshot.wallets:
+                    tracker = wallet_trackers.get(wallet['address'])
+                    if tracker is None:
+                        tracker = DailyPnLTracker(log_path=pnl_log_path(wallet['address']), label=wallet['label'])
+                        wallet_trackers[wallet['address']] = tracker
+                    tracker.update(wallet['total'])
+                    wallet_pnls[wallet['address']] = tracker.get_daily_pnl()
+                realized_pnls = update_transaction_trackers(tx_trackers, wallets, settings)
+                stage_counts['pnl'] += 1
+
+                # Print current balances
+                print("\n=== Current Balances ===")
+                for wallet in snapshot.wallets:
+                    role = "Active" if wallet['role'] == 'botting' else "Vault"
+                    print(f"{role} Wallet ({wallet['label']}):")
+                    print(f"  SOL:  {wallet['sol']:.2f}")
+                    print(f"  WSOL: {wallet['wsol']:.2f}")
+                    print(f"  USDC: {wallet['usdc']:.2f}")
+                    print(f"  Daily PnL: {wallet_pnls[wallet['address']]:+.2f} SOL")
+                    if wallet['address'] in realized_pnls:
+                        realized_pnl, transactions = realized_pnls[wallet['address']]
+                        print(f"  Realized PnL: {realized_pnl:+.3f} SOL ({transactions} tx)")
+                print(f"Total Balance: {snapshot.total:.2f} SOL")
+                print(f"Daily PnL: {daily_pnl:+.2f} SOL")
+                print(f"Max Drawdown: {pnl_tracker.get_max_drawdown():.2f} SOL")
+                delta_10min = pnl_tracker.get_delta(10)
+                if delta_10min is not None:
+                    print(f"10min Change: {delta_10min:+.2f} SOL")
+
+            # Stage 4: low balance alert; runs every loop so reminders are time based,
+            # but only sends when the alert engine asks for a notification
+            if previous is not None:
+                configure_alert_engine(alert_engine, settings)
+                event = alert_engine.update(previous.total)
+                if event is not None:
+                    print(f"Sending low balance {event.kind} notification...")  # Add debug print
+                    send_discord_alert(previous.botting_sol, previous.botting_wsol, daily_pnl, event)
+                    stage_counts['alert'] += 1
+
+            # Stage 5: regular update every 10 minutes, only if balances moved since the last one
             current_time = datetime.datetime.now()
-            if last_update_time is None or (current_time - last_update_time).seconds >= 600:  # 600 seconds = 10 minutes
+            update_due = last_update_time is None or (current_time - last_update_time).seconds >= 600  # 600 seconds = 10 minutes
+            if update_due and previous is not None and previous.has_changed(last_reported):
                 print("Sending regular balance update...")  # Add debug print
-                send_discord_balance_and_pnl(active_sol, active_wsol, vault_sol, vault_usdc, daily_pnl)
+                send_discord_balance_and_pnl(previous, wallet_pnls, daily_pnl, realized_pnls)
                 last_update_time = current_time
-            
-            # Print current balances
-            print("\n=== Current Balances ===")
-            print(f"Active Wallet:")
-            print(f"  SOL:  {active_sol:.2f}")
-            print(f"  WSOL: {active_wsol:.2f}")
-            print(f"Vault Wallet:")
-            print(f"  SOL:  {vault_sol:.2f}")
-            print(f"  USDC: {vault_usdc:.2f}")
-            print(f"Total Balance: {total_balance:.2f} SOL")
-            print(f"Daily PnL: {daily_pnl:+.2f} SOL")
+                last_reported = previous
+                stage_counts['update'] += 1
+
+            # Stage 6: daily/weekly reports from the rollups, once per period
+            if previous is not None:
+                stage_counts['report'] += send_scheduled_reports(rollups, report_schedule, tx_trackers)
+
+            print_pipeline_stats(stage_counts)
             
             time.sleep(20)  # Main loop delay
             
@@ -1,23 +1,42 @@
 import time
 import json
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from discord_webhook import DiscordWebhook, DiscordEmbed
 from pathlib import Path
 import os
 
+try:
+    from .settings_store import get_settings
+    from .rpc import RpcError, pool as rpc_pool
+    from .scheduler import WalletScheduler, RateLimiter
+    from .wallet_state import WalletStateStore
+    from .webhooks import send_webhook, ALERT
+    from .spl_token import (
+        WSOL_MINT, LAMPORTS_PER_SOL, MAX_ACCOUNTS_PER_REQUEST,
+        get_wallets_balances, owner_token_amount, ui_amount
+    )
+except ImportError:
+    from settings_store import get_settings
+    from rpc import RpcError, pool as rpc_pool
+    from scheduler import WalletScheduler, RateLimiter
+    from wallet_state import WalletStateStore
+    from webhooks import send_webhook, ALERT
+    from spl_token import (
+        WSOL_MINT, LAMPORTS_PER_SOL, MAX_ACCOUNTS_PER_REQUEST,
+        get_wallets_balances, owner_token_amount, ui_amount
+    )
+
 # Constants that stay the same
 EMPTY_FILE = "empty.txt"
-
-def load_settings():
-    """Load settings from settings.json"""
-    try:
-        settings_path = os.path.join(os.path.dirname(__file__), 'settings.json')
-        with open(settings_path, 'r') as f:
-            settings = json.load(f)
-        return settings
-    except Exception as e:
-        print(f"Error loading settings: {e}")
-        return {}
+# Go up two directories from this file's location to reach the root
+PRESETS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'config', 'preset', 'presets.json'
+)
+PRESETS_REFRESH_SECONDS = 5  # Longest sleep, so presets.json edits are picked up quickly
+WALLETS_PER_REQUEST = MAX_ACCOUNTS_PER_REQUEST // 2  # Owner account + WSOL account per wallet
+ALERTED_RECHECK_SECONDS = 1800  # Alerted wallets are still checked this often to notice refunds
+REARM_FACTOR = 1.5  # An alerted wallet re-arms once it holds this multiple of the threshold
 
 def load_alerted_wallets():
     try:
@@ -29,54 +48,101 @@ def load_alerted_wallets():
         print(f"Error loading alerted wallets: {e}")
         return set()
 
-def save_alerted_wallet(wallet):
-    try:
-        with open(EMPTY_FILE, 'a') as f:
-            f.write(f"{wallet}\n")
-    except Exception as e:
-        print(f"Error saving alerted wallet: {e}")
-
-def get_sol_balance(wallet_address, settings):
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getBalance",
-        "params": [wallet_address]
-    }
-    
-    try:
-        response = requests.post(settings['solana_rpc_url'], json=payload, headers=headers)
-        result = response.json()
-        if 'result' in result and 'value' in result['result']:
-            return result['result']['value'] / 1_000_000_000
-    except Exception as e:
-        print(f"Error getting SOL balance: {e}")
-    return 0.0
-
-def get_wsol_balance(wallet_address, settings):
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTokenAccountsByOwner",
-        "params": [
-            wallet_address,
-            {"mint": "So11111111111111111111111111111111111111112"},
-            {"encoding": "jsonParsed"}
-        ]
-    }
-    
-    try:
-        response = requests.post(settings['solana_rpc_url'], json=payload, headers=headers)
-        result = response.json()
-        if 'result' in result and 'value' in result['result']:
-            accounts = result['result']['value']
-            if accounts:
-                return int(accounts[0]['account']['data']['parsed']['info']['tokenAmount']['amount']) / 1_000_000_000
-    except Exception as e:
-        print(f"Error getting WSOL balance: {e}")
-    return 0.0
+def migrate_alerted_wallets(store):
+    """Move wallets from the old empty.txt into the state store, once"""
+    wallets = load_alerted_wallets()
+    if not wallets:
+        return
+    added = store.import_alerted(wallets, os.path.getmtime(EMPTY_FILE))
+    os.replace(EMPTY_FILE, f"{EMPTY_FILE}.migrated")
+    print(f"Migrated {added} alerted wallets from {EMPTY_FILE}")
+
+def check_wallets(wallets, settings, limiter=None):
+    """(SOL, WSOL) balances of many wallets from chunked getMultipleAccounts requests
+
+    Wallets without a WSOL associated token account only get the slower owner
+    scan if their SOL alone is below the threshold; if that scan fails their
+    entry is (None, None) so they are skipped rather than reported empty.
+    Every request, retries included, waits for limiter, if given.
+    """
+    results = get_wallets_balances([(wallet, [WSOL_MINT]) for wallet in wallets], settings,
+                                   max_retries=3, scan_missing=False, limiter=limiter)
+    balances = []
+    for wallet, result in zip(wallets, results):
+        sol_balance = result['lamports'] / LAMPORTS_PER_SOL
+        wsol_amount = result['tokens'][WSOL_MINT]
+        if wsol_amount is None:
+            if sol_balance >= settings['target_balance_threshold']:
+                wsol_amount = 0
+            else:
+                try:
+                    # The batch already showed the ATA is missing, so go straight to the owner scan
+                    wsol_amount = owner_token_amount(wallet, WSOL_MINT, settings, max_retries=1, limiter=limiter)
+                except RpcError as e:
+                    print(f"Error getting WSOL balance for {wallet}: {e}")
+                    balances.append((None, None))
+                    continue
+        balances.append((sol_balance, ui_amount(wsol_amount, WSOL_MINT)))
+    return balances
+
+def check_due_wallets(wallets, scheduler, store, settings, executor, limiter):
+    """Check due wallets in concurrent chunks, alert on empty ones, re-arm refunded ones and reschedule
+
+    Alerts go out as soon as the chunk holding the wallet comes back; the
+    per-wallet log is printed afterwards in the order the wallets were due.
+    """
+    start = time.monotonic()
+    threshold = settings['target_balance_threshold']
+    chunks = [wallets[i:i + WALLETS_PER_REQUEST] for i in range(0, len(wallets), WALLETS_PER_REQUEST)]
+    futures = {executor.submit(check_wallets, chunk, settings, limiter): i for i, chunk in enumerate(chunks)}
+    logs = [[] for _ in chunks]
+    checked = []
+
+    for future in as_completed(futures):
+        index = futures[future]
+        log = logs[index]
+        try:
+            balances = future.result()
+        except Exception as e:
+            log.append(f"Error getting wallet balances: {e}")
+            for wallet in chunks[index]:
+                scheduler.retry(wallet)
+            continue
+
+        for wallet, (sol_balance, wsol_balance) in zip(chunks[index], balances):
+            if sol_balance is None:
+                scheduler.retry(wallet)
+                continue
+            total_balance = sol_balance + wsol_balance
+            checked.append((wallet, total_balance))
+            log.append(f"Wallet: {wallet}")
+            log.append(f"SOL: {sol_balance:.2f}")
+            log.append(f"WSOL: {wsol_balance:.2f}")
+            log.append(f"Total: {total_balance:.2f} SOL")
+
+            if store.is_alerted(wallet):
+                if total_balance >= threshold * REARM_FACTOR:
+                    store.rearm(wallet)
+                    interval = scheduler.record(wallet, total_balance, threshold)
+                    log.append(f"Refunded, alert re-armed. Next check in {interval:.0f}s")
+                else:
+                    scheduler.postpone(wallet, ALERTED_RECHECK_SECONDS)
+                    log.append("Already alerted")
+            elif total_balance < threshold:
+                send_alert(wallet, sol_balance, wsol_balance, settings)
+                store.mark_alerted(wallet)
+                scheduler.postpone(wallet, ALERTED_RECHECK_SECONDS)
+                log.append("Alert sent")
+            else:
+                interval = scheduler.record(wallet, total_balance, threshold)
+                log.append(f"Next check in {interval:.0f}s")
+            log.append("-" * 50)
+
+    store.record_checks(checked)
+    for log in logs:
+        for line in log:
+            print(line)
+    print(f"Checked {len(wallets)} wallets in {len(chunks)} requests, {time.monotonic() - start:.2f}s")
 
 def send_alert(wallet_address, sol_balance, wsol_balance, settings):
     total_balance = sol_balance + wsol_balance
@@ -92,77 +158,113 @@ def send_alert(wallet_address, sol_balance, wsol_balance, settings):
         content=f"<@{settings['discord_id']}>"
     )
     webhook.add_embed(embed)
-    webhook.execute()
+    send_webhook(webhook, ALERT)
 
-def get_wallets_from_presets():
+def extract_preset_wallets(data):
+    """Copy trade wallets (copy_trade_wallet1-30) of every sniper and copy trade preset"""
     wallets = set()  # Using set to avoid duplicates
-    try:
-        # Go up two directories from current file location to reach root
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        preset_path = os.path.join(base_dir, 'config', 'preset', 'presets.json')
-        
-        print(f"Looking for presets.json at: {preset_path}")  # Debug line
-        
-        with open(preset_path, 'r') as f:
-            data = json.load(f)
-            
-        # Check both sol_sniper and sol_copy_trade sections
-        sections = ['sol_sniper', 'sol_copy_trade']
-        for section in sections:
-            if section in data:
-                for entry in data[section]:
-                    if 'task_input' in entry:
-                        # Check all possible wallet keys (1-30)
-                        for i in range(1, 31):
-                            wallet_key = f'copy_trade_wallet{i}'
-                            if wallet_key in entry['task_input']:
-                                wallet = entry['task_input'][wallet_key]
-                                if wallet and isinstance(wallet, str) and len(wallet) > 0:
-                                    wallets.add(wallet)
-        
-        return list(wallets)
-    except Exception as e:
-        print(f"Error reading presets.json: {e}")
-        return []
+    # Check both sol_sniper and sol_copy_trade sections
+    sections = ['sol_sniper', 'sol_copy_trade']
+    for section in sections:
+        for entry in data.get(section) or []:
+            for key, wallet in (entry.get('task_input') or {}).items():
+                if not key.startswith('copy_trade_wallet'):
+                    continue
+                number = key[len('copy_trade_wallet'):]
+                if number.isdigit() and 1 <= int(number) <= 30 and wallet and isinstance(wallet, str):
+                    wallets.add(wallet)
+    return wallets
+
+class PresetWallets:
+    """Wallets from presets.json, re-parsed only when the file's mtime or size changes"""
+
+    def __init__(self, path=PRESETS_PATH):
+        self.path = path
+        self.wallets = set()
+        self._signature = None
+
+    def refresh(self):
+        """Reload if the file changed; returns True if the wallet set changed"""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if self._signature != 'missing':
+                print(f"Error reading presets.json: {e}")
+                self._signature = 'missing'
+            return False
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+        if self._signature is None:
+            print(f"Loading wallets from presets.json at: {self.path}")
+        self._signature = signature
+
+        try:
+            with open(self.path, 'r') as f:
+                wallets = extract_preset_wallets(json.load(f))
+        except Exception as e:
+            # Keep the last good wallets if the file is mid-write or broken
+            print(f"Error reading presets.json: {e}")
+            return False
+
+        changed = wallets != self.wallets
+        self.wallets = wallets
+        return changed
+
+def first_check_at(store, wallet, now):
+    """When a wallet that just appeared in presets.json should first be checked"""
+    if not store.is_alerted(wallet):
+        return now
+    # Alerted wallets are only re-checked at the background rate
+    state = store.get(wallet)
+    last = state['checked_at'] or state['alerted_at'] or now
+    return last + ALERTED_RECHECK_SECONDS
 
 def monitor_wallets():
-    settings = load_settings()
+    settings = get_settings()
     if not settings:
         print("Failed to load settings. Exiting...")
         return
         
-    alerted_wallets = load_alerted_wallets()
+    store = WalletStateStore()
+    migrate_alerted_wallets(store)
+    scheduler = WalletScheduler()
+    presets = PresetWallets()
+    limiter = RateLimiter()
+    executor = None
+    workers = None
     
     while True:
         try:
-            wallets = get_wallets_from_presets()
-            print(f"\nMonitoring {len(wallets)} unique wallet addresses")
-            print(f"Previously alerted wallets: {len(alerted_wallets)}")
-            print("-" * 50)
-            
-            for wallet in wallets:
-                if wallet in alerted_wallets:
-                    continue
-                    
-                sol_balance = get_sol_balance(wallet, settings)
-                time.sleep(0.2)
-                wsol_balance = get_wsol_balance(wallet, settings)
-                time.sleep(0.2)
-                
-                total_balance = sol_balance + wsol_balance
-                print(f"Wallet: {wallet}")
-                print(f"SOL: {sol_balance:.2f}")
-                print(f"WSOL: {wsol_balance:.2f}")
-                print(f"Total: {total_balance:.2f} SOL")
+            settings = get_settings()
+            now = time.time()
+            if presets.refresh():
+                # New wallets are due immediately; removed ones stop being checked
+                added, removed = scheduler.sync(presets.wallets, lambda wallet: first_check_at(store, wallet, now))
+                print(f"\nMonitoring {len(presets.wallets)} unique wallet addresses "
+                      f"(+{len(added)} / -{len(removed)})")
+                print(f"Previously alerted wallets: {store.alerted_count(presets.wallets)}")
                 print("-" * 50)
-                
-                if total_balance < settings['target_balance_threshold']:
-                    send_alert(wallet, sol_balance, wsol_balance, settings)
-                    save_alerted_wallet(wallet)
-                    alerted_wallets.add(wallet)
-                    time.sleep(1)
-            
-            time.sleep(15)
+
+            # All workers share one RPC budget
+            limiter.configure(settings['check_empty_ct_requests_per_minute'] / 60)
+            concurrency = max(settings['check_empty_ct_concurrency'], 1)
+            if concurrency != workers:
+                if executor:
+                    executor.shutdown(wait=False)
+                executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ctcheck")
+                rpc_pool.reserve_workers(concurrency)
+                workers = concurrency
+
+            # The most overdue wallets first, one request per worker
+            pending = scheduler.due(now, concurrency * WALLETS_PER_REQUEST)
+            if pending:
+                check_due_wallets(pending, scheduler, store, settings, executor, limiter)
+
+            next_due = scheduler.next_due()
+            wait = next_due - time.time() if next_due is not None else PRESETS_REFRESH_SECONDS
+            time.sleep(min(max(wait, 1.0), PRESETS_REFRESH_SECONDS))
             
         except Exception as e:
             print(f"Error in monitoring loop: {e}")
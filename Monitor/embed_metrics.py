@@ -0,0 +1,142 @@
+import re
+
+try:
+    from .rolling_stats import RollingCounter, RollingNumeric
+except ImportError:
+    from rolling_stats import RollingCounter, RollingNumeric
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+DURATION = "duration"
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)\s*([a-z]*)', re.IGNORECASE)
+_DURATION_UNITS = {'ms': 0.001, 'sec': 1, 's': 1, 'min': 60, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_numeric(text):
+    """First number in text; an int unless it has a fractional part"""
+    match = _NUMBER.search(text)
+    if not match:
+        raise ValueError(f"No number in {text!r}")
+    number = match.group()
+    return float(number) if '.' in number else int(number)
+
+
+def parse_duration(text):
+    """Duration in seconds from text such as '350ms', '1.5s', '2m 30s' or '7d' (bare numbers are seconds)"""
+    parts = _DURATION_PART.findall(text)
+    if not parts:
+        raise ValueError(f"No duration in {text!r}")
+    seconds = 0.0
+    for amount, unit in parts:
+        unit = unit.lower()
+        if unit and unit not in _DURATION_UNITS:
+            raise ValueError(f"Unknown time unit {unit!r} in {text!r}")
+        seconds += float(amount) * _DURATION_UNITS.get(unit, 1)
+    return seconds
+
+
+def parse_category(text):
+    return text.strip()
+
+
+PARSERS = {
+    NUMERIC: parse_numeric,
+    DURATION: parse_duration,
+    CATEGORICAL: parse_category,
+}
+
+
+class FieldSpec:
+    """How to read one embed field: its name, the kind of value and, optionally, allowed categories"""
+
+    def __init__(self, name, kind, categories=None):
+        if kind not in PARSERS:
+            raise ValueError(f"Unknown field kind {kind!r}")
+        self.name = name
+        self.kind = kind
+        self.categories = tuple(categories) if categories else None
+        self.parse = PARSERS[kind]
+
+    def value(self, text):
+        """Parsed value of the field text, or None if it is not an allowed category"""
+        value = self.parse(text)
+        if self.categories is not None and value not in self.categories:
+            return None
+        return value
+
+
+def parse_field_specs(entries):
+    """FieldSpecs from 'Field Name:kind' strings; the kind defaults to numeric"""
+    specs = []
+    for entry in entries:
+        name, _, kind = entry.rpartition(':')
+        if not name:
+            name, kind = kind, NUMERIC
+        try:
+            specs.append(FieldSpec(name.strip(), kind.strip().lower() or NUMERIC))
+        except ValueError as e:
+            print(f"Ignoring tracked field {entry!r}: {e}")
+    return specs
+
+
+class FieldExtractor:
+    """Pulls the tracked fields out of message embeds with one dict lookup per field"""
+
+    def __init__(self, specs):
+        self.specs = {spec.name: spec for spec in specs}
+
+    def extract(self, embeds):
+        """(field name, value) for every tracked field in the embeds"""
+        values = []
+        for embed in embeds:
+            for field in embed.fields:
+                spec = self.specs.get(field.name)
+                if spec is None:
+                    continue
+                try:
+                    value = spec.value(field.value)
+                except (AttributeError, ValueError) as e:
+                    print(f"Error parsing {field.name}: {e}")
+                    continue
+                if value is not None:
+                    values.append((field.name, value))
+        return values
+
+
+class RollingMetrics:
+    """A rolling-window aggregator per tracked field: counts for categories, mean/quantiles for numbers"""
+
+    def __init__(self, specs, window=86400):
+        self.window = window
+        self.specs = {}
+        self.aggregators = {}
+        self.configure(specs)
+
+    def configure(self, specs):
+        """Track exactly these fields, keeping the windows of fields that stay with the same kind"""
+        old_specs = self.specs
+        self.specs = {spec.name: spec for spec in specs}
+        self.aggregators = {
+            name: self.aggregators[name]
+            if name in old_specs and old_specs[name].kind == spec.kind else self._aggregator(spec)
+            for name, spec in self.specs.items()
+        }
+
+    def add(self, ts, name, value):
+        aggregator = self.aggregators.get(name)
+        if aggregator is not None:
+            aggregator.add(ts, value)
+
+    def expire(self, now):
+        for aggregator in self.aggregators.values():
+            aggregator.expire(now)
+
+    def get(self, name):
+        return self.aggregators.get(name)
+
+    def _aggregator(self, spec):
+        if spec.kind == CATEGORICAL:
+            return RollingCounter(self.window)
+        return RollingNumeric(self.window)
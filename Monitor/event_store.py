@@ -0,0 +1,108 @@
+import json
+import os
+import sqlite3
+import threading
+
+try:
+    from .balance_history import DATA_DIR
+except ImportError:
+    from balance_history import DATA_DIR
+
+# Where EventStore() keeps its database unless given a path
+DEFAULT_PATH = os.path.join(DATA_DIR, 'bot_events.db')
+
+
+class EventStore:
+    """Parsed Sharp embed fields, the last processed message per channel and hourly sketches, in SQLite
+
+    One row per (message, field). Writes are batched until commit(), which the
+    caller runs after each live message and every few hundred history messages.
+    """
+
+    def __init__(self, path=None):
+        path = path or DEFAULT_PATH
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " message_id INTEGER NOT NULL,"
+                " channel_id INTEGER NOT NULL,"
+                " ts REAL NOT NULL,"
+                " field TEXT NOT NULL,"
+                " value,"
+                " PRIMARY KEY (message_id, field))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS events_ts ON events (ts)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " channel_id INTEGER PRIMARY KEY,"
+                " message_id INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sketches ("
+                " hour INTEGER PRIMARY KEY,"
+                " data TEXT NOT NULL)"
+            )
+
+    def add(self, message_id, channel_id, ts, fields):
+        """Queue the (field, value) pairs of a message and move the channel's checkpoint to it"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO events (message_id, channel_id, ts, field, value) VALUES (?, ?, ?, ?, ?)",
+                [(message_id, channel_id, ts, field, value) for field, value in fields]
+            )
+            self._db.execute(
+                "INSERT INTO checkpoints (channel_id, message_id) VALUES (?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET message_id = MAX(message_id, excluded.message_id)",
+                (channel_id, message_id)
+            )
+
+    def save_sketches(self, sketches):
+        """Queue serialized hourly sketches (hour -> dict) to be written with the next commit"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sketches (hour, data) VALUES (?, ?)",
+                [(hour, json.dumps(data)) for hour, data in sketches.items()]
+            )
+
+    def load_sketches(self, since):
+        """(hour, dict) of every stored sketch from since on"""
+        with self._lock:
+            rows = self._db.execute("SELECT hour, data FROM sketches WHERE hour >= ?", (since,)).fetchall()
+        return [(hour, json.loads(data)) for hour, data in rows]
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def checkpoint(self, channel_id):
+        """ID of the newest processed message in the channel, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT message_id FROM checkpoints WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def events_since(self, ts):
+        """(message_id, channel_id, ts, field, value) rows from ts on, oldest first"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT message_id, channel_id, ts, field, value FROM events "
+                "WHERE ts >= ? ORDER BY ts, message_id", (ts,)
+            ).fetchall()
+
+    def prune(self, before, sketches_before=None):
+        """Delete events (and optionally sketches) older than before; returns how many events were removed"""
+        with self._lock, self._db:
+            if sketches_before is not None:
+                self._db.execute("DELETE FROM sketches WHERE hour < ?", (sketches_before,))
+            return self._db.execute("DELETE FROM events WHERE ts < ?", (before,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
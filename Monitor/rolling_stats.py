@@ -0,0 +1,211 @@
+import heapq
+
+try:
+    from .sketches import QuantileSketch
+except ImportError:
+    from sketches import QuantileSketch
+
+
+class CountTree:
+    """Counts of non-negative integers in a Fenwick tree, for O(log n) order statistics"""
+
+    def __init__(self, size=64):
+        self.counts = {}
+        self._resize(size)
+
+    def add(self, value, delta=1):
+        if value < 0:
+            raise ValueError(f"Negative value {value}")
+        if value >= self.size:
+            self._resize(max(self.size * 2, value + 1))
+        count = self.counts.get(value, 0) + delta
+        if count:
+            self.counts[value] = count
+        else:
+            del self.counts[value]
+        self._add(value, delta)
+
+    def kth(self, k):
+        """The k-th smallest value, 1-based"""
+        pos = 0
+        step = 1 << (self.size.bit_length() - 1)
+        while step:
+            if pos + step <= self.size and self.tree[pos + step] < k:
+                pos += step
+                k -= self.tree[pos]
+            step >>= 1
+        return pos
+
+    def clear(self):
+        self.counts.clear()
+        self._resize(self.size)
+
+    def _add(self, value, delta):
+        i = value + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _resize(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        for value, count in self.counts.items():
+            self._add(value, count)
+
+
+class RollingWindow:
+    """Samples of the last window seconds, expired by timestamp rather than arrival order
+
+    Samples sit in a heap keyed by time, so backfilled channels and live messages
+    can interleave freely. A sample already older than the window, measured from
+    the newest sample seen, is ignored. Subclasses keep their aggregates in
+    _insert/_remove.
+    """
+
+    def __init__(self, window=86400):
+        self.window = window
+        self.samples = []  # Heap of (epoch seconds, value)
+        self.newest = float('-inf')
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, ts, value):
+        self.newest = max(self.newest, ts)
+        if ts <= self.newest - self.window:
+            return
+        heapq.heappush(self.samples, (ts, value))
+        self._insert(value)
+        self.expire(self.newest)
+
+    def expire(self, now):
+        """Drop samples older than window seconds before now"""
+        cutoff = now - self.window
+        while self.samples and self.samples[0][0] <= cutoff:
+            _, value = heapq.heappop(self.samples)
+            self._remove(value)
+
+    def clear(self):
+        self.samples.clear()
+        self.newest = float('-inf')
+
+    def _insert(self, value):
+        raise NotImplementedError
+
+    def _remove(self, value):
+        raise NotImplementedError
+
+
+class RollingWindowStats(RollingWindow):
+    """Mean, median and value counts of the samples from the last window seconds
+
+    Samples are (epoch seconds, non-negative int). Adding and expiring are
+    O(log n) heap operations plus an O(log n) tree update; the median is an
+    O(log n) order-statistic query.
+    """
+
+    def __init__(self, window=86400):
+        super().__init__(window)
+        self.total = 0
+        self.tree = CountTree()
+
+    def _insert(self, value):
+        self.tree.add(value)
+        self.total += value
+
+    def _remove(self, value):
+        self.total -= value
+        self.tree.add(value, -1)
+
+    def clear(self):
+        super().clear()
+        self.total = 0
+        self.tree.clear()
+
+    def mean(self):
+        return self.total / len(self.samples) if self.samples else None
+
+    def median(self):
+        """Median with the same even-count rule as statistics.median"""
+        n = len(self.samples)
+        if not n:
+            return None
+        if n % 2:
+            return self.tree.kth(n // 2 + 1)
+        return (self.tree.kth(n // 2) + self.tree.kth(n // 2 + 1)) / 2
+
+    def frequencies(self):
+        """(value, count) pairs in ascending value order"""
+        return sorted(self.tree.counts.items())
+
+
+class RollingCounter(RollingWindow):
+    """Counts of categorical values seen in the last window seconds"""
+
+    def __init__(self, window=86400):
+        super().__init__(window)
+        self.counts = {}
+
+    def _insert(self, category):
+        self.counts[category] = self.counts.get(category, 0) + 1
+
+    def _remove(self, category):
+        self.counts[category] -= 1
+        if not self.counts[category]:
+            del self.counts[category]
+
+    def clear(self):
+        super().clear()
+        self.counts.clear()
+
+    def most_common(self):
+        return sorted(self.counts.items(), key=lambda item: -item[1])
+
+
+class RollingNumeric(RollingWindow):
+    """Mean and approximate quantiles of numbers from the last window seconds
+
+    Unlike RollingWindowStats this takes any magnitude, sign or fractional value;
+    the quantiles come from sketches with 1% relative error (one for positive
+    values, one for the magnitudes of negative ones) that samples leave again
+    when they expire.
+    """
+
+    def __init__(self, window=86400):
+        super().__init__(window)
+        self.total = 0.0
+        self.sketch = QuantileSketch()
+        self.negative = QuantileSketch()
+
+    def _insert(self, value):
+        self.total += value
+        if value < 0:
+            self.negative.add(-value)
+        else:
+            self.sketch.add(value)
+
+    def _remove(self, value):
+        self.total -= value
+        if value < 0:
+            self.negative.add(-value, -1)
+        else:
+            self.sketch.add(value, -1)
+
+    def clear(self):
+        super().clear()
+        self.total = 0.0
+        self.sketch = QuantileSketch()
+        self.negative = QuantileSketch()
+
+    def mean(self):
+        return self.total / len(self.samples) if self.samples else None
+
+    def quantile(self, q):
+        if not self.samples:
+            return None
+        rank = q * (len(self.samples) - 1)
+        negatives = self.negative.count
+        if rank < negatives:
+            # Negative values in ascending order are their magnitudes in descending order
+            return -self.negative.value_at(negatives - 1 - rank)
+        return self.sketch.value_at(rank - negatives)
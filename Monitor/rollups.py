@@ -0,0 +1,205 @@
+import array
+import datetime
+import json
+import os
+import struct
+import time
+
+try:
+    from .balance_history import DATA_DIR
+except ImportError:
+    from balance_history import DATA_DIR
+
+# One bucket on disk: int64 bucket start + float64 open, close, min, max
+BUCKET = struct.Struct('<qdddd')
+
+# (name, bucket width in seconds, buckets kept)
+RESOLUTIONS = (
+    ("minute", 60, 2 * 1440),
+    ("hour", 3600, 60 * 24),
+    ("day", 86400, 400),
+)
+
+
+class RollupSeries:
+    """Fixed-size ring of open/close/min/max buckets, mirrored slot for slot in a binary file"""
+
+    def __init__(self, name, width, capacity, path):
+        self.name = name
+        self.width = width
+        self.capacity = capacity
+        self.path = path
+        self.starts = array.array('q', [-1]) * capacity
+        self.opens = array.array('d', bytes(8 * capacity))
+        self.closes = array.array('d', bytes(8 * capacity))
+        self.mins = array.array('d', bytes(8 * capacity))
+        self.maxs = array.array('d', bytes(8 * capacity))
+        self._file = self._open()
+
+    def update(self, ts, value):
+        """Fold a sample into its bucket; only touches the disk if the bucket changed"""
+        start = ts - ts % self.width
+        slot = (start // self.width) % self.capacity
+        if self.starts[slot] != start:
+            if self.starts[slot] > start:
+                return  # Older than what this slot already holds
+            self.starts[slot] = start
+            self.opens[slot] = self.closes[slot] = self.mins[slot] = self.maxs[slot] = value
+        elif value == self.closes[slot]:
+            return
+        else:
+            self.closes[slot] = value
+            self.mins[slot] = min(self.mins[slot], value)
+            self.maxs[slot] = max(self.maxs[slot], value)
+        self._write(slot)
+
+    def get(self, ts):
+        """Bucket containing ts as a dict, or None if nothing was recorded"""
+        start = ts - ts % self.width
+        slot = (start // self.width) % self.capacity
+        if self.starts[slot] != start:
+            return None
+        return {
+            "start": start,
+            "open": self.opens[slot],
+            "close": self.closes[slot],
+            "min": self.mins[slot],
+            "max": self.maxs[slot],
+        }
+
+    def summary(self, start, end):
+        """Merge the buckets in [start, end) into one open/close/min/max, or None"""
+        merged = None
+        for ts in range(start - start % self.width, end, self.width):
+            bucket = self.get(ts)
+            if bucket is None:
+                continue
+            if merged is None:
+                merged = dict(bucket)
+            else:
+                merged["close"] = bucket["close"]
+                merged["min"] = min(merged["min"], bucket["min"])
+                merged["max"] = max(merged["max"], bucket["max"])
+        return merged
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, slot):
+        if not self._file:
+            return
+        self._file.seek(slot * BUCKET.size)
+        self._file.write(BUCKET.pack(self.starts[slot], self.opens[slot], self.closes[slot],
+                                     self.mins[slot], self.maxs[slot]))
+        self._file.flush()
+
+    def _open(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if not os.path.exists(self.path):
+                with open(self.path, 'wb') as f:
+                    f.write(BUCKET.pack(-1, 0.0, 0.0, 0.0, 0.0) * self.capacity)
+            f = open(self.path, 'r+b')
+            data = f.read(self.capacity * BUCKET.size)
+            loaded = 0
+            for slot, (start, open_, close, low, high) in enumerate(BUCKET.iter_unpack(data[:len(data) - len(data) % BUCKET.size])):
+                # A resized ring may map old buckets to different slots
+                if start < 0 or (start // self.width) % self.capacity != slot:
+                    continue
+                self.starts[slot] = start
+                self.opens[slot], self.closes[slot], self.mins[slot], self.maxs[slot] = open_, close, low, high
+                loaded += 1
+            if len(data) < self.capacity * BUCKET.size:
+                f.seek(len(data) - len(data) % BUCKET.size)
+                f.write(BUCKET.pack(-1, 0.0, 0.0, 0.0, 0.0) * (self.capacity - len(data) // BUCKET.size))
+                f.flush()
+            if loaded:
+                print(f"Loaded {loaded} {self.name} rollups from {self.path}")
+            return f
+        except OSError as e:
+            print(f"Error opening {self.name} rollups: {e}")
+            return None
+
+
+class BalanceRollups:
+    """Minute, hour and day rollups of a balance series, persisted across restarts"""
+
+    def __init__(self, directory=DATA_DIR, prefix='balance'):
+        self.series = {
+            name: RollupSeries(name, width, capacity, os.path.join(directory, f"{prefix}_{name}.bin"))
+            for name, width, capacity in RESOLUTIONS
+        }
+
+    def update(self, value, ts=None):
+        ts = int(time.time() if ts is None else ts)
+        for series in self.series.values():
+            series.update(ts, value)
+
+    def daily_report(self, day):
+        """Open/close/min/max and PnL of a UTC day from its day bucket"""
+        start = _day_start(day)
+        return _report(self.series["day"].get(start), day, day)
+
+    def weekly_report(self, week_start):
+        """Open/close/min/max and PnL of the 7 UTC days starting at week_start"""
+        start = _day_start(week_start)
+        merged = self.series["day"].summary(start, start + 7 * 86400)
+        return _report(merged, week_start, week_start + datetime.timedelta(days=6))
+
+    def close(self):
+        for series in self.series.values():
+            series.close()
+
+
+class ReportSchedule:
+    """Remembers which daily/weekly reports were sent so restarts neither skip nor repeat them"""
+
+    def __init__(self, path=os.path.join(DATA_DIR, 'report_schedule.json')):
+        self.path = path
+        self.sent = {"daily": None, "weekly": None}
+        try:
+            with open(path, 'r') as f:
+                self.sent.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading report schedule: {e}")
+
+    def due(self, now=None):
+        """Reports that should go out now, as (kind, first day) pairs
+
+        Only the most recently completed day and week are reported; older
+        periods missed while the monitor was down are not back-filled.
+        """
+        today = (now or datetime.datetime.now(datetime.timezone.utc)).date()
+        yesterday = today - datetime.timedelta(days=1)
+        last_week = today - datetime.timedelta(days=today.weekday() + 7)  # Monday of last week
+        due = []
+        if self.sent["daily"] != yesterday.isoformat():
+            due.append(("daily", yesterday))
+        if self.sent["weekly"] != last_week.isoformat():
+            due.append(("weekly", last_week))
+        return due
+
+    def mark_sent(self, kind, day):
+        self.sent[kind] = day.isoformat()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.sent, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving report schedule: {e}")
+
+
+def _day_start(day):
+    return int(datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _report(bucket, first_day, last_day):
+    if bucket is None:
+        return None
+    return dict(bucket, first_day=first_day, last_day=last_day, pnl=bucket["close"] - bucket["open"])
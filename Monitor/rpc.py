@@ -0,0 +1,263 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+
+class RpcError(Exception):
+    """Raised when a Solana RPC call fails after all retries"""
+
+
+class RpcEndpoint:
+    """One RPC URL with a rolling window of request latencies and failures"""
+
+    def __init__(self, url, window=50):
+        self.url = url
+        self.session = requests.Session()  # Keep-alive connection pool per endpoint
+        self.samples = deque(maxlen=window)  # (latency seconds, ok)
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.samples.append((latency, ok))
+            if ok:
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= 3:
+                    # Take a failing endpoint out of rotation for a while
+                    self.down_until = time.monotonic() + min(10 * self.consecutive_failures, 120)
+
+    def is_healthy(self):
+        return time.monotonic() >= self.down_until
+
+    def error_rate(self):
+        with self.lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def latency(self, quantile):
+        """Latency quantile of successful requests in the window, or None without data"""
+        with self.lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(int(quantile * len(latencies)), len(latencies) - 1)]
+
+    def score(self):
+        """Lower is better: median latency inflated by the recent error rate"""
+        median = self.latency(0.5)
+        if median is None:
+            median = 0.0  # Untried endpoints get a chance
+        return median * (1 + 4 * self.error_rate())
+
+
+class RpcPool:
+    """Routes requests to the fastest healthy endpoint, optionally hedging slow ones"""
+
+    def __init__(self, max_workers=8):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rpc")
+
+    def reserve_workers(self, count):
+        """Make room for count concurrent hedged requests (each may use two threads)"""
+        with self.lock:
+            if 2 * count <= self.max_workers:
+                return
+            old = self.executor
+            self.max_workers = 2 * count
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rpc")
+        old.shutdown(wait=False)
+
+    def configure(self, urls):
+        """Keep the endpoint set in sync with settings, preserving stats of known URLs"""
+        with self.lock:
+            if list(self.endpoints) == urls:
+                return
+            self.endpoints = {url: self.endpoints.get(url) or RpcEndpoint(url) for url in urls}
+
+    def ranked(self):
+        """Endpoints best first; unhealthy ones are kept at the end as a last resort"""
+        with self.lock:
+            endpoints = list(self.endpoints.values())
+        return sorted(endpoints, key=lambda e: (not e.is_healthy(), e.score()))
+
+    def post(self, payload, timeout, hedge=False, tried=None, record_failures=True):
+        """POST payload to the best endpoint; returns (endpoint, parsed JSON reply)
+
+        With hedge enabled, a duplicate request goes to the next-best endpoint if the
+        first has not answered within its p95 latency, and the first good reply wins.
+        Endpoints in tried are skipped while others remain, and every endpoint used
+        is added to it. With record_failures off, a failed request does not count
+        against the endpoint's health.
+        """
+        tried = set() if tried is None else tried
+        candidates = [e for e in self.ranked() if e.url not in tried] or self.ranked()
+        if not candidates:
+            raise RpcError("No RPC endpoints configured")
+
+        primary = candidates[0]
+        if not hedge or len(candidates) < 2:
+            # Nothing to race, so send from the calling thread
+            tried.add(primary.url)
+            return primary, self._send(primary, payload, timeout, record_failures=record_failures)
+
+        started = threading.Event()
+        futures = {self.executor.submit(self._send, primary, payload, timeout, started, record_failures): primary}
+        p95 = primary.latency(0.95)
+        delay = min(max(p95 if p95 is not None else 1.0, 0.05), 2.0)
+        # Time spent queued for a worker must not count toward the hedge delay
+        started.wait()
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            backup = candidates[1]
+            futures[self.executor.submit(self._send, backup, payload, timeout, None, record_failures)] = backup
+        tried.update(endpoint.url for endpoint in futures.values())
+
+        last_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return futures[future], future.result()
+                except Exception as e:
+                    last_error = e
+        raise last_error
+
+    def _send(self, endpoint, payload, timeout, started=None, record_failures=True):
+        if started is not None:
+            started.set()
+        start = time.monotonic()
+        try:
+            response = endpoint.session.post(endpoint.url, json=payload, timeout=timeout)
+            if not response.ok:
+                raise RpcError(f"HTTP Error: {response.status_code} - {response.text[:100]}")
+            try:
+                reply = response.json()
+            except ValueError:
+                raise RpcError(f"Error parsing JSON response: {response.text[:100]}...")
+        except Exception:
+            if record_failures:
+                endpoint.record(time.monotonic() - start, False)
+            raise
+        endpoint.record(time.monotonic() - start, True)
+        return reply
+
+    def status(self):
+        """One line per endpoint with health, latency and error rate"""
+        lines = []
+        for endpoint in self.ranked():
+            p50, p95 = endpoint.latency(0.5), endpoint.latency(0.95)
+            lines.append(
+                f"{endpoint.url}: {'up' if endpoint.is_healthy() else 'down'}, "
+                f"p50 {p50 * 1000 if p50 is not None else 0:.0f}ms, "
+                f"p95 {p95 * 1000 if p95 is not None else 0:.0f}ms, "
+                f"errors {endpoint.error_rate():.0%}"
+            )
+        return lines
+
+
+# Shared by every module so latency stats are pooled
+pool = RpcPool()
+
+
+def endpoint_urls(settings):
+    """RPC URLs from settings: solana_rpc_url followed by any extra solana_rpc_urls"""
+    urls = []
+    for url in [settings.get('solana_rpc_url')] + list(settings.get('solana_rpc_urls') or []):
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def _request(payload, settings, max_retries, timeout, describe, limiter=None, record_failures=True):
+    """Send payload with failover across endpoints; returns the parsed reply
+
+    Every attempt, retries included, waits for limiter if one is given. With
+    record_failures off, failures don't count against endpoint health.
+    """
+    pool.configure(endpoint_urls(settings))
+    if not pool.endpoints:
+        raise RpcError("No RPC endpoints configured; set solana_rpc_url")
+    hedge = settings.get('rpc_hedge_requests', False)
+    backoff_time = 0.5
+    max_backoff_time = 8
+    last_error = None
+    tried = set()
+
+    for attempt in range(max_retries):
+        if tried and len(tried) >= len(pool.endpoints):
+            # Every endpoint failed this round; back off briefly before starting over
+            wait_time = min(backoff_time * (2 ** (attempt - 1)), max_backoff_time)
+            print(f"Retrying {describe} in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
+            time.sleep(wait_time)
+            tried.clear()
+        if limiter:
+            limiter.acquire()
+        try:
+            endpoint, reply = pool.post(payload, timeout, hedge, tried, record_failures)
+        except Exception as e:
+            last_error = str(e)
+            print(f"RPC error for {describe}: {last_error}")
+            continue
+
+        error = reply.get('error') if isinstance(reply, dict) else None
+        if error is not None:
+            last_error = f"{error.get('code')}: {error.get('message')}"
+            if error.get('code') == 429:
+                # Rate limited; count it against this endpoint and try another
+                if record_failures:
+                    endpoint.record(0.0, False)
+                print(f"Rate limit exceeded on {endpoint.url}")
+                continue
+            raise RpcError(f"{describe} returned an error: {last_error}")
+        return reply
+
+    raise RpcError(f"{describe} failed after {max_retries} attempts: {last_error}")
+
+
+def rpc_call(method, params, settings, max_retries=5, limiter=None):
+    """Call a Solana JSON-RPC method and return its result; raises RpcError on failure"""
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": method,
+        "params": params
+    }
+    reply = _request(payload, settings, max_retries, timeout=30, describe=method, limiter=limiter)
+    if 'result' not in reply:
+        raise RpcError(f"Unexpected response format for {method}: {reply}")
+    return reply['result']
+
+
+def rpc_batch(calls, settings, max_retries=5, limiter=None, probe=False):
+    """Send several (method, params) calls as one JSON-RPC batch; returns results in order
+
+    A call that comes back with an error gets None as its result. A probe checks
+    whether the provider accepts batches at all: it is sent once, and a rejection
+    doesn't count against the endpoint's health.
+    """
+    if not calls:
+        return []
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    replies = _request(payload, settings, 1 if probe else max_retries, timeout=60,
+                       describe=f"batch of {len(calls)} calls", limiter=limiter, record_failures=not probe)
+    if not isinstance(replies, list):
+        raise RpcError(f"Unexpected batch response: {replies}")
+
+    results = [None] * len(calls)
+    for reply in replies:
+        if 'result' in reply and isinstance(reply.get('id'), int) and reply['id'] < len(calls):
+            results[reply['id']] = reply['result']
+    return results
@@ -0,0 +1,150 @@
+import heapq
+import threading
+import time
+
+MIN_INTERVAL = 10  # Seconds between checks of a wallet at or below the threshold
+MAX_INTERVAL = 600  # Seconds between checks of a wallet far above it
+DROP_SMOOTHING = 0.5  # Weight of the newest sample in the drop-rate average
+
+
+class WalletState:
+    def __init__(self):
+        self.total = None
+        self.checked_at = None
+        self.drop_rate = 0.0  # Smoothed SOL per second the balance has been falling
+        self.due_at = None
+        self.interval = None
+
+
+class WalletScheduler:
+    """Priority queue of wallets ordered by when each should next be checked
+
+    A wallet's interval shrinks the closer its balance is to the threshold and the
+    faster it has been dropping, between min_interval and max_interval. New wallets
+    are due immediately. Stale heap entries are skipped lazily.
+    """
+
+    def __init__(self, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.wallets = {}
+        self._heap = []
+
+    def __len__(self):
+        return len(self.wallets)
+
+    def sync(self, wallets, due_at=None):
+        """Track exactly the given wallets; returns (added, removed)
+
+        Added wallets are due at due_at(wallet) if given, otherwise right away.
+        Wallets that stay keep their schedule.
+        """
+        wallets = set(wallets)
+        added = wallets - set(self.wallets)
+        removed = set(self.wallets) - wallets
+        for wallet in removed:
+            self.remove(wallet)
+        for wallet in added:
+            self.add(wallet, due_at(wallet) if due_at else None)
+        return added, removed
+
+    def add(self, wallet, due_at=None):
+        """Start tracking wallet (if needed) and make it due at due_at, by default right away"""
+        self.wallets.setdefault(wallet, WalletState())
+        self._schedule(wallet, time.time() if due_at is None else due_at)
+
+    def remove(self, wallet):
+        self.wallets.pop(wallet, None)
+
+    def due(self, now=None, limit=None):
+        """Pop the wallets due by now, most overdue first, at most limit of them"""
+        now = time.time() if now is None else now
+        wallets = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(wallets) < limit):
+            due_at, wallet = heapq.heappop(self._heap)
+            state = self.wallets.get(wallet)
+            if state is None or state.due_at != due_at:
+                continue  # Removed or rescheduled since this entry was pushed
+            state.due_at = None
+            wallets.append(wallet)
+        return wallets
+
+    def next_due(self):
+        """Time the next wallet becomes due, or None if nothing is scheduled"""
+        while self._heap:
+            due_at, wallet = self._heap[0]
+            state = self.wallets.get(wallet)
+            if state is not None and state.due_at == due_at:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def record(self, wallet, total, threshold, now=None):
+        """Reschedule wallet after a successful check; returns the new interval"""
+        now = time.time() if now is None else now
+        state = self.wallets.get(wallet)
+        if state is None:
+            return None
+        if state.total is not None and now > state.checked_at:
+            drop = max((state.total - total) / (now - state.checked_at), 0.0)
+            state.drop_rate = DROP_SMOOTHING * drop + (1 - DROP_SMOOTHING) * state.drop_rate
+        state.total = total
+        state.checked_at = now
+        state.interval = self.interval(total, state.drop_rate, threshold)
+        self._schedule(wallet, now + state.interval)
+        return state.interval
+
+    def retry(self, wallet, now=None):
+        """Reschedule wallet after a failed check"""
+        self.postpone(wallet, self.min_interval, now)
+
+    def postpone(self, wallet, delay, now=None):
+        """Reschedule wallet a fixed delay from now, regardless of its balance"""
+        if wallet in self.wallets:
+            self._schedule(wallet, (time.time() if now is None else now) + delay)
+
+    def interval(self, total, drop_rate, threshold):
+        """Seconds until the next check of a wallet holding total SOL"""
+        headroom = total - threshold
+        if headroom <= 0:
+            return self.min_interval
+        # Proximity: scale linearly up to max_interval at 4x the threshold (or 4 SOL) of headroom
+        scale = 4 * max(threshold, 1.0)
+        interval = self.min_interval + (self.max_interval - self.min_interval) * min(headroom / scale, 1.0)
+        # Trend: check at least four times before the current drop rate would cross the threshold
+        if drop_rate > 0:
+            interval = min(interval, headroom / drop_rate / 4)
+        return max(self.min_interval, min(interval, self.max_interval))
+
+    def _schedule(self, wallet, due_at):
+        state = self.wallets[wallet]
+        state.due_at = due_at
+        heapq.heappush(self._heap, (due_at, wallet))
+
+
+class RateLimiter:
+    """Spaces out calls from any number of threads to at most per_second starts per second
+
+    acquired counts every call let through, so a limiter without a rate still
+    counts the requests made with it.
+    """
+
+    def __init__(self, per_second=None):
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self.acquired = 0
+        self.configure(per_second)
+
+    def configure(self, per_second):
+        """Change the rate; None, 0 or a negative rate means no limit"""
+        self.spacing = 1.0 / per_second if per_second and per_second > 0 else 0.0
+
+    def acquire(self):
+        """Block until the caller may start its call"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.spacing
+            self.acquired += 1
+        if start > now:
+            time.sleep(start - now)
@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+import time
+
+SETTINGS_PATH = os.path.join(os.path.dirname(__file__), 'settings.json')
+
+# Setting type for a list of labelled wallets
+WALLETS = "wallets"
+# Setting type for a list of strings
+STRINGS = "strings"
+# Setting type for a list of integers (e.g. Discord channel IDs)
+INTEGERS = "integers"
+
+# Expected type of every known setting. Unknown keys are passed through untouched.
+SETTINGS_SCHEMA = {
+    "solana_rpc_url": str,
+    "solana_rpc_urls": STRINGS,
+    "rpc_hedge_requests": bool,
+    "botting_address": str,
+    "vault_address": str,
+    "botting_wallets": WALLETS,
+    "vault_wallets": WALLETS,
+    "discord_id": str,
+    "analyser_csv_webhook": str,
+    "analyser_single_webhook": str,
+    "balance_10min_webhook": str,
+    "balance_daily_webhook": str,
+    "check_empty_ct_webhook": str,
+    "your_balance_threshold": float,
+    "target_balance_threshold": float,
+    "check_empty_ct_requests_per_minute": float,
+    "check_empty_ct_concurrency": int,
+    "your_balance_clear_threshold": float,
+    "balance_alert_renotify_minutes": list,
+    "balance_alert_escalate_after": int,
+    "balance_alert_max_notifications": int,
+    "balance_alert_cooldown_minutes": float,
+    "bot_token": str,
+    "sharp_webhook_channel_id": int,
+    "sharp_webhook_channel_ids": INTEGERS,
+    "bot_stats_channel_id": int,
+    "bot_stats_update_seconds": float,
+    "bot_tracked_fields": STRINGS,
+    "bot_backfill_hours": float,
+    "bot_backfill_concurrency": int,
+}
+
+# Value used when a setting is missing, empty or invalid
+SETTINGS_DEFAULTS = {
+    str: "",
+    float: 0.0,
+    bool: False,
+    int: None,
+    list: [],
+    WALLETS: [],
+    STRINGS: [],
+    INTEGERS: [],
+}
+
+# Per-setting defaults that override the type default above
+SETTINGS_KEY_DEFAULTS = {
+    "balance_alert_renotify_minutes": [10.0, 30.0, 60.0],
+    "balance_alert_escalate_after": 3,
+    "balance_alert_max_notifications": 10,
+    "balance_alert_cooldown_minutes": 10.0,
+    "check_empty_ct_requests_per_minute": 12.0,
+    "check_empty_ct_concurrency": 4,
+    "bot_stats_update_seconds": 10.0,
+    "bot_backfill_hours": 24.0,
+    "bot_backfill_concurrency": 4,
+}
+
+
+def parse_wallets(value):
+    """Parse labelled wallets into [{"label", "address"}]
+
+    Accepts a list of {"label", "address"} dicts, or "label:address" / "address"
+    entries given as a list or a comma separated string.
+    """
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    wallets = []
+    for entry in value:
+        if isinstance(entry, dict):
+            label, address = entry.get('label'), entry['address']
+        else:
+            label, _, address = str(entry).strip().rpartition(':')
+        address = address.strip()
+        if not address:
+            raise ValueError("Wallet entry without an address")
+        wallets.append({"label": (label or '').strip() or address[:6], "address": address})
+    return wallets
+
+
+def _coerce(key, value, expected):
+    """Convert a raw JSON value to the type expected for key"""
+    default = SETTINGS_KEY_DEFAULTS.get(key, SETTINGS_DEFAULTS.get(expected))
+    if value is None or value == "":
+        return default
+    try:
+        if expected is str:
+            return str(value).strip()
+        if expected is float:
+            return float(value)
+        if expected is bool:
+            if isinstance(value, str):
+                if value.strip().lower() not in ('true', 'false', 'yes', 'no', '1', '0', 'on', 'off'):
+                    raise ValueError(value)
+                return value.strip().lower() in ('true', 'yes', '1', 'on')
+            return bool(value)
+        if expected is int:
+            return int(value)
+        if expected is list:
+            # Accept a JSON list or a comma separated string of numbers
+            if isinstance(value, str):
+                value = [part for part in value.split(',') if part.strip()]
+            return [float(part) for part in value]
+        if expected == WALLETS:
+            return parse_wallets(value)
+        if expected == INTEGERS:
+            if isinstance(value, str):
+                value = [part for part in value.split(',') if part.strip()]
+            elif not isinstance(value, list):
+                value = [value]
+            return [int(part) for part in value]
+        if expected == STRINGS:
+            if isinstance(value, str):
+                value = value.split(',')
+            return [str(part).strip() for part in value if str(part).strip()]
+    except (TypeError, ValueError):
+        print(f"Invalid value for setting '{key}': {value!r}, using {default!r}")
+        return default
+    return value
+
+
+def validate_settings(raw):
+    """Return a typed copy of the raw settings dict"""
+    settings = dict(raw)
+    for key, expected in SETTINGS_SCHEMA.items():
+        settings[key] = _coerce(key, raw.get(key), expected)
+    return settings
+
+
+class SettingsStore:
+    """Parsed and validated settings.json, reloaded only when the file changes"""
+
+    def __init__(self, path=SETTINGS_PATH, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval  # Minimum seconds between mtime checks
+        self._lock = threading.RLock()
+        self._raw = {}
+        self._settings = {}
+        self._mtime = None
+        self._last_check = None
+        self._subscribers = []
+
+    def get(self):
+        """Return the current typed settings, reloading if the file has changed"""
+        now = time.monotonic()
+        if self._last_check is None or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self._reload_if_changed()
+        return self._settings
+
+    def raw(self):
+        """Return a copy of the settings exactly as stored in the file"""
+        self.get()
+        with self._lock:
+            return dict(self._raw)
+
+    def subscribe(self, callback):
+        """Call callback(settings) every time new settings are loaded or saved"""
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def save(self, raw):
+        """Write raw settings to disk and apply them immediately"""
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(raw, f, indent=4)
+            os.replace(tmp_path, self.path)
+            self._apply(dict(raw), os.stat(self.path).st_mtime_ns)
+        self._notify()
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._mtime is None:
+                print(f"Error loading settings: {e}")
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, 'r') as f:
+                    raw = json.load(f)
+            except Exception as e:
+                # Keep the last good settings if the file is mid-write or broken
+                print(f"Error loading settings: {e}")
+                self._mtime = mtime
+                return
+            self._apply(raw, mtime)
+        self._notify()
+
+    def _apply(self, raw, mtime):
+        self._raw = raw
+        self._settings = validate_settings(raw)
+        self._mtime = mtime
+
+    def _notify(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            settings = self._settings
+        for callback in subscribers:
+            try:
+                callback(settings)
+            except Exception as e:
+                print(f"Error in settings subscriber: {e}")
+
+
+# Shared store used by every module
+store = SettingsStore()
+
+
+def get_settings():
+    """Return the shared, typed settings"""
+    return store.get()
+
+
+def load_raw_settings():
+    """Return the untyped settings as stored in settings.json"""
+    return store.raw()
+
+
+def save_settings(raw):
+    """Save settings to settings.json and notify subscribers"""
+    try:
+        store.save(raw)
+        return True
+    except Exception as e:
+        print(f"Error saving settings: {e}")
+        return False
+
+
+def subscribe(callback):
+    """Register a callback for settings changes"""
+    return store.subscribe(callback)
@@ -0,0 +1,130 @@
+import math
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch style)
+
+    Positive values land in logarithmic bins of ratio gamma, so any quantile is
+    within relative_accuracy of the true value. Zeros are counted separately.
+    If more than max_bins are in use the lowest bins are collapsed, which only
+    affects the accuracy of the smallest values.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value, count=1):
+        """Add value count times; a negative count removes earlier additions"""
+        if value < 0:
+            raise ValueError(f"Negative value {value}")
+        if value == 0:
+            self.zero += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            total = self.bins.get(index, 0) + count
+            if total > 0:
+                self.bins[index] = total
+            else:
+                self.bins.pop(index, None)
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same accuracy"""
+        self.zero += other.zero
+        self.count += other.count
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), or None if the sketch is empty"""
+        if not self.count:
+            return None
+        return self.value_at(q * (self.count - 1))
+
+    def value_at(self, rank):
+        """Approximate value of the sample at 0-based rank in ascending order"""
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint of the bin (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {"zero": self.zero, "count": self.count, "bins": {str(i): c for i, c in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data, relative_accuracy=0.01):
+        sketch = cls(relative_accuracy)
+        sketch.zero = data["zero"]
+        sketch.count = data["count"]
+        sketch.bins = {int(i): c for i, c in data["bins"].items()}
+        return sketch
+
+    def _collapse(self):
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        folded = sum(self.bins.pop(index) for index in indexes[:excess])
+        target = indexes[excess]
+        self.bins[target] += folded
+
+
+class HourlySketches:
+    """One QuantileSketch per UTC hour; any window's quantiles come from merging its hours"""
+
+    def __init__(self, retention_hours=31 * 24, relative_accuracy=0.01):
+        self.retention = retention_hours * 3600
+        self.relative_accuracy = relative_accuracy
+        self.hours = {}
+        self.dirty = set()
+
+    def add(self, ts, value):
+        hour = int(ts) - int(ts) % 3600
+        sketch = self.hours.get(hour)
+        if sketch is None:
+            sketch = self.hours[hour] = QuantileSketch(self.relative_accuracy)
+        sketch.add(value)
+        self.dirty.add(hour)
+
+    def load(self, hour, data):
+        self.hours[hour] = QuantileSketch.from_dict(data, self.relative_accuracy)
+
+    def pop_dirty(self):
+        """hour -> serialized sketch for every hour changed since the last call"""
+        dirty = {hour: self.hours[hour].to_dict() for hour in self.dirty if hour in self.hours}
+        self.dirty.clear()
+        return dirty
+
+    def expire(self, now):
+        cutoff = now - self.retention
+        for hour in [hour for hour in self.hours if hour + 3600 <= cutoff]:
+            del self.hours[hour]
+            self.dirty.discard(hour)
+
+    def merged(self, start, end):
+        """Sketch of every hour overlapping [start, end)"""
+        sketch = QuantileSketch(self.relative_accuracy)
+        for hour, hourly in self.hours.items():
+            if hour + 3600 > start and hour < end:
+                sketch.merge(hourly)
+        return sketch
+
+    def quantiles(self, start, end, qs):
+        """Approximate quantiles over [start, end), or None if nothing was recorded"""
+        sketch = self.merged(start, end)
+        if not sketch.count:
+            return None
+        return [sketch.quantile(q) for q in qs]
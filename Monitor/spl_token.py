@@ -0,0 +1,275 @@
+import base64
+import hashlib
+import struct
+import time
+from functools import lru_cache
+
+try:
+    from .rpc import RpcError, rpc_call, rpc_batch
+except ImportError:
+    from rpc import RpcError, rpc_call, rpc_batch
+
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+MINT_DECIMALS = {
+    WSOL_MINT: 9,
+    USDC_MINT: 6,
+}
+
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+ASSOCIATED_TOKEN_PROGRAM_ID = "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL"
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+
+# ed25519 curve parameters, used to reject seeds that land on the curve
+ED25519_P = 2 ** 255 - 19
+ED25519_D = (-121665 * pow(121666, ED25519_P - 2, ED25519_P)) % ED25519_P
+
+# SPL token account layout: mint (32) | owner (32) | amount (u64 LE) | ...
+TOKEN_ACCOUNT_HEAD = struct.Struct('<32s32sQ')
+# Only the head of each token account is requested from the RPC node
+TOKEN_DATA_SLICE = {"offset": 0, "length": TOKEN_ACCOUNT_HEAD.size}
+
+# Most RPC providers cap getMultipleAccounts at 100 addresses
+MAX_ACCOUNTS_PER_REQUEST = 100
+
+# How long to trust an owner scan that found no token account before scanning again
+OWNER_SCAN_INTERVAL = 300
+
+# How long to send chunks one by one after a JSON-RPC batch was rejected
+BATCH_RETRY_INTERVAL = 300
+
+# Time the last batch request was rejected, if any
+_batch_rejected_at = None
+# (owner, mint) -> token account found by an owner scan when the ATA does not exist
+_scanned_accounts = {}
+# (owner, mint) -> time of the last owner scan that found nothing
+_empty_scans = {}
+
+
+def b58decode(value):
+    """Decode a base58 string to bytes"""
+    number = 0
+    for char in value:
+        number = number * 58 + B58_INDEX[char]
+    data = number.to_bytes((number.bit_length() + 7) // 8, 'big') if number else b''
+    leading_zeros = len(value) - len(value.lstrip('1'))
+    return b'\x00' * leading_zeros + data
+
+
+def b58encode(data):
+    """Encode bytes as a base58 string"""
+    number = int.from_bytes(data, 'big')
+    encoded = ''
+    while number:
+        number, rem = divmod(number, 58)
+        encoded = B58_ALPHABET[rem] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b'\x00'))
+    return '1' * leading_zeros + encoded
+
+
+@lru_cache(maxsize=4096)
+def decode_pubkey(address):
+    """Decode a base58 address into its 32 raw bytes"""
+    key = b58decode(address)
+    if len(key) != 32:
+        raise ValueError(f"Invalid public key: {address}")
+    return key
+
+
+def is_on_curve(key):
+    """Check whether 32 bytes decode to a valid ed25519 point"""
+    y = int.from_bytes(key, 'little') & ((1 << 255) - 1)
+    if y >= ED25519_P:
+        return False
+    sign = key[31] >> 7
+    y2 = y * y % ED25519_P
+    u = (y2 - 1) % ED25519_P
+    v = (ED25519_D * y2 + 1) % ED25519_P
+    # x^2 = u / v; a square root exists iff (u/v)^((p-1)/2) is 0 or 1
+    x2 = u * pow(v, ED25519_P - 2, ED25519_P) % ED25519_P
+    if x2 == 0:
+        return sign == 0
+    return pow(x2, (ED25519_P - 1) // 2, ED25519_P) == 1
+
+
+def find_program_address(seeds, program_id):
+    """Derive a program address and bump seed the same way the Solana runtime does"""
+    program = decode_pubkey(program_id)
+    for bump in range(255, -1, -1):
+        digest = hashlib.sha256()
+        for seed in seeds:
+            digest.update(seed)
+        digest.update(bytes([bump]))
+        digest.update(program)
+        digest.update(b"ProgramDerivedAddress")
+        candidate = digest.digest()
+        if not is_on_curve(candidate):
+            return b58encode(candidate), bump
+    raise ValueError("Unable to find a viable program address bump seed")
+
+
+@lru_cache(maxsize=4096)
+def get_associated_token_address(owner, mint):
+    """Associated token account for owner and mint, derived locally and cached"""
+    seeds = [decode_pubkey(owner), decode_pubkey(TOKEN_PROGRAM_ID), decode_pubkey(mint)]
+    address, _ = find_program_address(seeds, ASSOCIATED_TOKEN_PROGRAM_ID)
+    return address
+
+
+def decode_token_account(data):
+    """Return (mint bytes, owner bytes, amount) from raw SPL token account data"""
+    view = memoryview(data)
+    if len(view) < TOKEN_ACCOUNT_HEAD.size:
+        raise ValueError(f"Token account data too short: {len(view)} bytes")
+    return TOKEN_ACCOUNT_HEAD.unpack_from(view)
+
+
+def account_data(account):
+    """Raw bytes of an account fetched with base64 encoding"""
+    data, encoding = account['data']
+    if encoding != 'base64':
+        raise ValueError(f"Unexpected account encoding: {encoding}")
+    return base64.b64decode(data)
+
+
+def token_account_amount(account, mint):
+    """Token amount held in a base64 account if it is a token account for mint, else 0"""
+    if account is None:
+        return 0
+    data = account_data(account)
+    if len(data) < TOKEN_ACCOUNT_HEAD.size:
+        return 0
+    account_mint, _, amount = decode_token_account(data)
+    return amount if account_mint == decode_pubkey(mint) else 0
+
+
+def ui_amount(amount, mint):
+    """Convert a raw token amount to whole tokens"""
+    return amount / 10 ** MINT_DECIMALS[mint]
+
+
+def fetch_accounts(addresses, settings, max_retries=5, limiter=None):
+    """Fetch accounts as base64 in one getMultipleAccounts call; returns (slot, accounts)"""
+    params = [list(addresses), {"encoding": "base64", "dataSlice": TOKEN_DATA_SLICE}]
+    result = rpc_call("getMultipleAccounts", params, settings, max_retries, limiter)
+    return result['context']['slot'], result['value']
+
+
+def fetch_accounts_batched(addresses, settings, max_retries=5, chunk_size=MAX_ACCOUNTS_PER_REQUEST, limiter=None):
+    """Fetch any number of accounts in chunks of chunk_size; returns (slots, accounts)
+
+    slots[i] is the context slot of the request that returned accounts[i]. Several
+    chunks go out as one JSON-RPC batch; if the provider rejects batches the chunks
+    are sent one by one instead, and a chunk that failed inside a batch is retried
+    on its own.
+    """
+    global _batch_rejected_at
+    if not addresses:
+        return [], []
+    chunks = [addresses[start:start + chunk_size] for start in range(0, len(addresses), chunk_size)]
+    results = [None] * len(chunks)
+    batch_allowed = _batch_rejected_at is None or time.time() - _batch_rejected_at >= BATCH_RETRY_INTERVAL
+    if len(chunks) > 1 and batch_allowed:
+        calls = [
+            ("getMultipleAccounts", [chunk, {"encoding": "base64", "dataSlice": TOKEN_DATA_SLICE}])
+            for chunk in chunks
+        ]
+        try:
+            # One attempt that leaves endpoint health alone; on failure the chunks go out singly
+            results = rpc_batch(calls, settings, limiter=limiter, probe=True)
+            _batch_rejected_at = None
+        except RpcError as e:
+            print(f"Batch request failed, sending {len(chunks)} requests instead: {e}")
+            _batch_rejected_at = time.time()
+
+    slots = []
+    accounts = []
+    for chunk, result in zip(chunks, results):
+        if result is None:
+            slot, values = fetch_accounts(chunk, settings, max_retries, limiter)
+        else:
+            slot, values = result['context']['slot'], result['value']
+        slots.extend([slot] * len(values))
+        accounts.extend(values)
+    return slots, accounts
+
+
+def get_wallets_balances(wallets, settings, max_retries=5, scan_missing=True, limiter=None):
+    """Lamports and raw token amounts for many wallets in as few requests as possible
+
+    wallets is a list of (owner, mints) pairs. Returns one dict per wallet, in order,
+    with the context slot, the owner's lamports and a mint -> amount map. With
+    scan_missing off, a mint without an associated token account maps to None
+    instead of triggering a getTokenAccountsByOwner scan. Every request waits for
+    limiter, if given.
+    """
+    addresses = []
+    for owner, mints in wallets:
+        addresses.append(owner)
+        addresses.extend(_token_address(owner, mint) for mint in mints)
+    slots, accounts = fetch_accounts_batched(addresses, settings, max_retries, limiter=limiter)
+
+    results = []
+    index = 0
+    for owner, mints in wallets:
+        owner_account = accounts[index]
+        slot = min(slots[index:index + 1 + len(mints)])
+        tokens = {}
+        for offset, mint in enumerate(mints, start=1):
+            account = accounts[index + offset]
+            if account is None:
+                # No associated token account; fall back to the (expensive) owner scan
+                tokens[mint] = owner_token_amount(owner, mint, settings, max_retries, limiter) if scan_missing else None
+            else:
+                tokens[mint] = token_account_amount(account, mint)
+        results.append({
+            "slot": slot,
+            "lamports": owner_account['lamports'] if owner_account else 0,
+            "tokens": tokens,
+        })
+        index += 1 + len(mints)
+    return results
+
+
+def get_token_amount(owner, mint, settings, max_retries=5):
+    """Raw token amount held by owner for mint, read from its associated token account"""
+    params = [_token_address(owner, mint), {"encoding": "base64", "dataSlice": TOKEN_DATA_SLICE}]
+    account = rpc_call("getAccountInfo", params, settings, max_retries)['value']
+    if account is not None:
+        return token_account_amount(account, mint)
+    return owner_token_amount(owner, mint, settings, max_retries)
+
+
+def _token_address(owner, mint):
+    return _scanned_accounts.get((owner, mint)) or get_associated_token_address(owner, mint)
+
+
+def owner_token_amount(owner, mint, settings, max_retries=5, limiter=None):
+    """Raw token amount of owner for mint when it has no associated token account
+
+    Scans the owner's token accounts, at most every OWNER_SCAN_INTERVAL while
+    the scan keeps finding nothing.
+    """
+    key = (owner, mint)
+    _scanned_accounts.pop(key, None)
+    last_scan = _empty_scans.get(key)
+    if last_scan is not None and time.time() - last_scan < OWNER_SCAN_INTERVAL:
+        return 0
+    return _scan_owner_accounts(owner, mint, settings, max_retries, limiter)
+
+
+def _scan_owner_accounts(owner, mint, settings, max_retries, limiter=None):
+    params = [owner, {"mint": mint}, {"encoding": "base64", "dataSlice": TOKEN_DATA_SLICE}]
+    accounts = rpc_call("getTokenAccountsByOwner", params, settings, max_retries, limiter)['value']
+    key = (owner, mint)
+    if not accounts:
+        _empty_scans[key] = time.time()
+        return 0
+    _empty_scans.pop(key, None)
+    _scanned_accounts[key] = accounts[0]['pubkey']
+    return token_account_amount(accounts[0]['account'], mint)
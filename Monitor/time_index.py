@@ -0,0 +1,53 @@
+import bisect
+
+
+class TimeIndex:
+    """Values of one field ordered by timestamp, for lookups over any window
+
+    Appends are O(1). Samples that arrive out of order, such as several channels
+    backfilled one after another, are merged in lazily before the next lookup.
+    A window is two bisects plus a slice of the values inside it.
+    """
+
+    def __init__(self):
+        self.times = []
+        self.values = []
+        self._sorted = True
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, ts, value):
+        if self.times and ts < self.times[-1]:
+            self._sorted = False
+        self.times.append(ts)
+        self.values.append(value)
+
+    def between(self, start, end=None):
+        """Values with start <= ts < end (or up to the newest if end is None), oldest first"""
+        self._sort()
+        lo = bisect.bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect.bisect_left(self.times, end)
+        return self.values[lo:hi]
+
+    def expire(self, before):
+        """Drop samples older than before"""
+        self._sort()
+        cut = bisect.bisect_left(self.times, before)
+        if cut:
+            del self.times[:cut]
+            del self.values[:cut]
+
+    def clear(self):
+        self.times.clear()
+        self.values.clear()
+        self._sorted = True
+
+    def _sort(self):
+        if self._sorted:
+            return
+        # Stable, so samples with the same timestamp keep their arrival order
+        order = sorted(range(len(self.times)), key=self.times.__getitem__)
+        self.times = [self.times[i] for i in order]
+        self.values = [self.values[i] for i in order]
+        self._sorted = True
@@ -0,0 +1,231 @@
+import datetime
+import json
+import os
+
+try:
+    from .rpc import RpcError, rpc_call, rpc_batch
+    from .spl_token import WSOL_MINT, LAMPORTS_PER_SOL
+    from .balance_history import DATA_DIR
+except ImportError:
+    from rpc import RpcError, rpc_call, rpc_batch
+    from spl_token import WSOL_MINT, LAMPORTS_PER_SOL
+    from balance_history import DATA_DIR
+
+SIGNATURE_PAGE_SIZE = 1000  # getSignaturesForAddress maximum
+MAX_PAGES_PER_POLL = 5  # Anything beyond this is left as a gap for later polls
+TRANSACTION_BATCH_SIZE = 50  # getTransaction calls per JSON-RPC batch
+DAYS_KEPT = 30  # Daily PnL buckets kept in the state file
+
+
+def _token_amounts(balances, wallet, account_keys, decimals=None):
+    """mint -> raw amount held by wallet in a pre/postTokenBalances list
+
+    If a decimals dict is given, the decimals of every mint seen are recorded in it.
+    """
+    amounts = {}
+    for balance in balances or []:
+        owner = balance.get('owner')
+        if owner is None:
+            # Older nodes omit the owner; fall back to the account key
+            owner = account_keys[balance['accountIndex']] if balance['accountIndex'] < len(account_keys) else None
+        if owner != wallet:
+            continue
+        mint = balance['mint']
+        amounts[mint] = amounts.get(mint, 0) + int(balance['uiTokenAmount']['amount'])
+        if decimals is not None:
+            decimals[mint] = balance['uiTokenAmount'].get('decimals', 0)
+    return amounts
+
+
+def transaction_delta(tx, wallet, excluded_addresses):
+    """SOL delta of wallet in a getTransaction result and the token it is attributed to
+
+    The delta is attributed to the non-WSOL mint whose balance changed the most in
+    token units (raw amount / 10**decimals), ties broken by mint, or to "SOL" if no
+    other token moved. Returns (lamports, mint) or None if the transaction moves
+    funds to or from an excluded address (e.g. the vault) and so is not trading PnL.
+    """
+    message = tx['transaction']['message']
+    meta = tx['meta']
+    account_keys = list(message['accountKeys'])
+    loaded = meta.get('loadedAddresses') or {}
+    account_keys += loaded.get('writable', []) + loaded.get('readonly', [])
+
+    if excluded_addresses.intersection(account_keys):
+        return None
+
+    lamports = 0
+    if wallet in account_keys:
+        i = account_keys.index(wallet)
+        lamports = meta['postBalances'][i] - meta['preBalances'][i]
+
+    decimals = {}
+    pre_tokens = _token_amounts(meta.get('preTokenBalances'), wallet, account_keys, decimals)
+    post_tokens = _token_amounts(meta.get('postTokenBalances'), wallet, account_keys, decimals)
+
+    # Wrapped SOL counts as SOL
+    lamports += post_tokens.get(WSOL_MINT, 0) - pre_tokens.get(WSOL_MINT, 0)
+
+    # Attribute the delta to the token that moved the most in the same transaction
+    mint = "SOL"
+    largest = 0
+    for candidate in sorted(set(pre_tokens) | set(post_tokens)):
+        if candidate == WSOL_MINT:
+            continue
+        change = abs(post_tokens.get(candidate, 0) - pre_tokens.get(candidate, 0)) / 10 ** decimals[candidate]
+        if change > largest:
+            mint, largest = candidate, change
+    return lamports, mint
+
+
+class TransactionPnLTracker:
+    """Realized SOL PnL of a wallet from its transactions, following a persisted signature cursor
+
+    Each poll only fetches signatures newer than the cursor ("until"). If more arrive
+    than one poll will page through, the older remainder is saved as a gap
+    ("before"/"until") and worked off by later polls.
+    """
+
+    def __init__(self, wallet, excluded_addresses=(), state_path=None):
+        self.wallet = wallet
+        self.excluded_addresses = set(excluded_addresses) - {wallet}
+        self.state_path = state_path or os.path.join(DATA_DIR, f"tx_pnl_{wallet[:8]}.json")
+        self.state = {"until": None, "gaps": [], "daily": {}, "processed": 0, "transfers": 0}
+        self._load_state()
+
+    def set_excluded_addresses(self, addresses):
+        self.excluded_addresses = set(addresses) - {self.wallet}
+
+    def poll(self, settings):
+        """Process new transactions; returns the number processed"""
+        if self.state['until'] is None:
+            # First run: start from the latest signature instead of scanning history
+            latest = self._signatures(settings, limit=1)
+            self.state['until'] = latest[0]['signature'] if latest else None
+            self._save_state()
+            print(f"Transaction PnL cursor for {self.wallet[:8]} starts at {self.state['until']}")
+            return 0
+
+        processed = 0
+        for gap in list(self.state['gaps']):
+            signatures, complete = self._page(settings, before=gap['before'], until=gap['until'])
+            done = self._process(settings, signatures)
+            processed += done
+            if done == 0 and signatures:
+                continue  # Nothing could be fetched yet; keep the gap as it is
+            self.state['gaps'].remove(gap)
+            if done < len(signatures):
+                # The newer part of this page is still unprocessed
+                self.state['gaps'].append({"before": gap['before'], "until": signatures[len(signatures) - done]['signature']})
+            if not complete:
+                self.state['gaps'].append({"before": signatures[-1]['signature'], "until": gap['until']})
+            self._save_state()
+
+        signatures, complete = self._page(settings, until=self.state['until'])
+        done = self._process(settings, signatures)
+        processed += done
+        if done:
+            if not complete:
+                # Too many new signatures for one poll; remember the older remainder as a gap
+                self.state['gaps'].append({"before": signatures[-1]['signature'], "until": self.state['until']})
+            # Resume after the newest processed transaction
+            self.state['until'] = signatures[len(signatures) - done]['signature']
+        self._save_state()
+        return processed
+
+    def daily_pnl(self, day=None):
+        """Realized PnL in SOL for a UTC day (default today)"""
+        day = day or datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        return self.state['daily'].get(day, {}).get('lamports', 0) / LAMPORTS_PER_SOL
+
+    def daily_transactions(self, day=None):
+        day = day or datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        return self.state['daily'].get(day, {}).get('transactions', 0)
+
+    def token_pnl(self, day=None):
+        """mint -> realized PnL in SOL for a UTC day (default today)"""
+        day = day or datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        tokens = self.state['daily'].get(day, {}).get('tokens', {})
+        return {mint: lamports / LAMPORTS_PER_SOL for mint, lamports in tokens.items()}
+
+    def _signatures(self, settings, limit, before=None, until=None):
+        options = {"limit": limit}
+        if before:
+            options["before"] = before
+        if until:
+            options["until"] = until
+        return rpc_call("getSignaturesForAddress", [self.wallet, options], settings)
+
+    def _page(self, settings, before=None, until=None):
+        """Signatures newest first, up to MAX_PAGES_PER_POLL pages; returns (signatures, complete)"""
+        signatures = []
+        for _ in range(MAX_PAGES_PER_POLL):
+            page = self._signatures(settings, SIGNATURE_PAGE_SIZE, before=before, until=until)
+            signatures.extend(page)
+            if len(page) < SIGNATURE_PAGE_SIZE:
+                return signatures, True
+            before = page[-1]['signature']
+        return signatures, False
+
+    def _process(self, settings, signatures):
+        """Fetch and account signatures oldest first; returns how many were processed
+
+        Stops at the first batch that fails, so the caller can move its cursor past
+        the transactions already accounted and not count them again.
+        """
+        ordered = list(reversed(signatures))
+        processed = 0
+        for start in range(0, len(ordered), TRANSACTION_BATCH_SIZE):
+            batch = ordered[start:start + TRANSACTION_BATCH_SIZE]
+            calls = [
+                ("getTransaction", [entry['signature'], {"encoding": "json", "maxSupportedTransactionVersion": 0}])
+                for entry in batch
+            ]
+            try:
+                transactions = rpc_batch(calls, settings)
+            except RpcError as e:
+                print(f"Error fetching transactions for {self.wallet[:8]}: {e}")
+                return processed
+            for entry, tx in zip(batch, transactions):
+                if tx is None:
+                    return processed
+                self._account(entry, tx)
+                processed += 1
+        return processed
+
+    def _account(self, entry, tx):
+        self.state['processed'] += 1
+        result = transaction_delta(tx, self.wallet, self.excluded_addresses)
+        if result is None:
+            self.state['transfers'] += 1
+            return
+        lamports, mint = result
+        block_time = tx.get('blockTime') or entry.get('blockTime')
+        moment = datetime.datetime.fromtimestamp(block_time, datetime.timezone.utc) if block_time else \
+            datetime.datetime.now(datetime.timezone.utc)
+        day = self.state['daily'].setdefault(moment.date().isoformat(), {"lamports": 0, "transactions": 0, "tokens": {}})
+        day['lamports'] += lamports
+        day['transactions'] += 1
+        day['tokens'][mint] = day['tokens'].get(mint, 0) + lamports
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                self.state.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading transaction PnL state: {e}")
+
+    def _save_state(self):
+        # Keep only the most recent days
+        for day in sorted(self.state['daily'])[:-DAYS_KEPT]:
+            del self.state['daily'][day]
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"Error saving transaction PnL state: {e}")
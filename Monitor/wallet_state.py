@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    from .balance_history import DATA_DIR
+except ImportError:
+    from balance_history import DATA_DIR
+
+OK = "ok"
+ALERTED = "alerted"
+
+
+class WalletStateStore:
+    """Per-wallet last balance, check time and alert state in a SQLite database
+
+    Runs in WAL mode and commits every write, so a crash loses at most the
+    write in progress. All access goes through one connection guarded by a lock.
+    The set of alerted wallets is also kept in memory, so checking a wallet's
+    alert state never touches the database.
+    """
+
+    def __init__(self, path=os.path.join(DATA_DIR, 'wallet_state.db')):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS wallets ("
+                " address TEXT PRIMARY KEY,"
+                " balance REAL,"
+                " checked_at REAL,"
+                " state TEXT NOT NULL DEFAULT 'ok',"
+                " alerted_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS wallets_state ON wallets (state)")
+            self._alerted = self._load_alerted()
+
+    def get(self, wallet):
+        """The wallet's row as a dict, or None if it was never seen"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM wallets WHERE address = ?", (wallet,)).fetchone()
+        return dict(row) if row else None
+
+    def is_alerted(self, wallet):
+        with self._lock:
+            return wallet in self._alerted
+
+    def alerted_count(self, wallets):
+        """How many of wallets are in the alerted state"""
+        with self._lock:
+            return len(self._alerted.intersection(wallets))
+
+    def record_checks(self, checks, now=None):
+        """Store the latest balance of many wallets at once; checks is [(wallet, balance)]"""
+        now = time.time() if now is None else now
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO wallets (address, balance, checked_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(address) DO UPDATE SET balance = excluded.balance, checked_at = excluded.checked_at",
+                [(wallet, balance, now) for wallet, balance in checks]
+            )
+
+    def mark_alerted(self, wallet, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO wallets (address, state, alerted_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(address) DO UPDATE SET state = excluded.state, alerted_at = excluded.alerted_at",
+                (wallet, ALERTED, now)
+            )
+            self._alerted.add(wallet)
+
+    def rearm(self, wallet):
+        with self._lock, self._db:
+            self._db.execute("UPDATE wallets SET state = ?, alerted_at = NULL WHERE address = ?", (OK, wallet))
+            self._alerted.discard(wallet)
+
+    def import_alerted(self, wallets, alerted_at):
+        """Mark wallets as alerted unless they are already known; returns how many were added"""
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO wallets (address, state, alerted_at) VALUES (?, ?, ?)",
+                [(wallet, ALERTED, alerted_at) for wallet in wallets]
+            )
+            # Wallets that were already known keep their state, so re-read the set
+            self._alerted = self._load_alerted()
+            return self._db.total_changes - before
+
+    def _load_alerted(self):
+        rows = self._db.execute("SELECT address FROM wallets WHERE state = ?", (ALERTED,))
+        return {row['address'] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
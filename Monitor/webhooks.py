@@ -0,0 +1,186 @@
+import atexit
+import heapq
+import itertools
+import json
+import threading
+import time
+
+import requests
+
+# Priorities, lowest first: alerts overtake any queued reports
+ALERT = 0
+REPORT = 1
+
+MAX_ATTEMPTS = 5
+REQUEST_TIMEOUT = 15
+EXIT_FLUSH_SECONDS = 10  # How long interpreter exit waits for queued messages
+
+
+class WebhookMessage:
+    """A webhook payload captured at enqueue time, so the caller can reuse its DiscordWebhook"""
+
+    def __init__(self, webhook, priority, seq):
+        self.url = webhook.url
+        self.payload = webhook.json
+        self.files = dict(webhook.files)
+        self.priority = priority
+        self.seq = seq
+        self.attempts = 0
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RateLimitBucket:
+    """Discord's rate limit for one webhook URL, from the X-RateLimit-* headers of its last response"""
+
+    def __init__(self):
+        self.blocked_until = 0.0
+
+    def update(self, headers, now):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is not None and reset_after is not None and int(remaining) <= 0:
+            self.blocked_until = max(self.blocked_until, now + float(reset_after))
+
+    def block(self, seconds, now):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class WebhookDispatcher:
+    """One worker thread that sends every Discord webhook over a pooled session
+
+    Messages wait in a queue per URL ordered by (priority, enqueue order), so
+    messages to one webhook keep their order within a priority. The worker sends
+    the most urgent message whose URL is not rate limited; 429s and server or
+    connection errors are retried, other errors are dropped with a log line.
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, timeout=REQUEST_TIMEOUT):
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.session = requests.Session()  # Keep-alive connections to discord.com
+        self._queues = {}  # url -> heap of WebhookMessage
+        self._buckets = {}  # url -> RateLimitBucket
+        self._global_until = 0.0
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._worker = None
+
+    def send(self, webhook, priority=REPORT):
+        """Queue a DiscordWebhook (embeds, content and files) and return immediately"""
+        if not webhook.url:
+            print("Webhook URL not configured, message dropped")
+            return
+        with self._cond:
+            message = WebhookMessage(webhook, priority, next(self._seq))
+            heapq.heappush(self._queues.setdefault(message.url, []), message)
+            self._buckets.setdefault(message.url, RateLimitBucket())
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="Webhook Dispatcher", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values()) + self._in_flight
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been sent or dropped; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(self._queues.values()) or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _next_message(self):
+        """Pop the most urgent sendable message, or return the seconds until one becomes sendable"""
+        now = time.monotonic()
+        if now < self._global_until:
+            return None, self._global_until - now
+        best = None
+        wait = None
+        for url, queue in self._queues.items():
+            if not queue:
+                continue
+            blocked_until = self._buckets[url].blocked_until
+            if blocked_until > now:
+                wait = min(wait, blocked_until - now) if wait is not None else blocked_until - now
+            elif best is None or queue[0] < best[0]:
+                best = queue
+        if best is None:
+            return None, wait
+        return heapq.heappop(best), None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                message, wait = self._next_message()
+                while message is None:
+                    self._cond.wait(wait)
+                    message, wait = self._next_message()
+                self._in_flight += 1
+            try:
+                retry = self._post(message)
+            except Exception as e:
+                print(f"Webhook error: {e}")
+                retry = True
+            with self._cond:
+                self._in_flight -= 1
+                if retry:
+                    if message.attempts < self.max_attempts:
+                        heapq.heappush(self._queues[message.url], message)
+                    else:
+                        print("Max retries reached for webhook, message dropped")
+                self._cond.notify_all()
+
+    def _post(self, message):
+        """Send one message; returns True if it should be retried"""
+        message.attempts += 1
+        bucket = self._buckets[message.url]
+        try:
+            if message.files:
+                files = dict(message.files, payload_json=(None, json.dumps(message.payload)))
+                response = self.session.post(message.url, files=files, timeout=self.timeout)
+            else:
+                response = self.session.post(message.url, json=message.payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Webhook error: {e}")
+            bucket.block(min(2 ** message.attempts, 30), time.monotonic())
+            return True
+        now = time.monotonic()
+        bucket.update(response.headers, now)
+        if response.status_code == 429:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            retry_after = float(body.get('retry_after') or response.headers.get('Retry-After') or 1)
+            print(f"Rate limited, waiting {retry_after} seconds...")
+            if body.get('global') or response.headers.get('X-RateLimit-Global'):
+                with self._cond:
+                    self._global_until = max(self._global_until, now + retry_after)
+            else:
+                bucket.block(retry_after, now)
+            message.attempts -= 1  # Waiting out a rate limit is not a failed attempt
+            return True
+        if response.status_code >= 500:
+            print(f"Webhook error: HTTP {response.status_code}")
+            bucket.block(min(2 ** message.attempts, 30), now)
+            return True
+        if response.status_code >= 400:
+            print(f"Webhook rejected: HTTP {response.status_code} {response.text[:200]}")
+        return False
+
+
+dispatcher = WebhookDispatcher()
+atexit.register(dispatcher.flush, EXIT_FLUSH_SECONDS)
+
+
+def send_webhook(webhook, priority=REPORT):
+    """Queue a DiscordWebhook on the shared dispatcher"""
+    dispatcher.send(webhook, priority)
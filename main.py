@@ -1,8 +1,7 @@
 import threading
 import sys
 import os
-import json
-from Monitor import ctanalyser, ctbalance, ctcheck, bot
+from Monitor import ctanalyser, ctbalance, ctcheck, bot, settings_store
 from colorama import init, Fore, Back, Style
 import time
 
@@ -14,25 +13,12 @@ def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 def load_settings():
-    """Load settings from settings.json"""
-    try:
-        settings_path = os.path.join(os.path.dirname(__file__), 'Monitor', 'settings.json')
-        with open(settings_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading settings: {e}")
-        return {}
+    """Load settings from settings.json as stored on disk"""
+    return settings_store.load_raw_settings()
 
 def save_settings(settings):
-    """Save settings to settings.json"""
-    try:
-        settings_path = os.path.join(os.path.dirname(__file__), 'Monitor', 'settings.json')
-        with open(settings_path, 'w') as f:
-            json.dump(settings, f, indent=4)
-        return True
-    except Exception as e:
-        print(f"Error saving settings: {e}")
-        return False
+    """Save settings to settings.json; running monitors pick them up immediately"""
+    return settings_store.save_settings(settings)
 
 def print_header(text):
     """Print a styled header"""
@@ -195,7 +181,7 @@ def run_discord_bot():
     """Run the Discord bot module"""
     print("Starting Discord Bot...")
     try:
-        bot.bot.run(bot.settings.get('bot_token'))
+        bot.bot.run(settings_store.get_settings().get('bot_token'))
     except Exception as e:
         print(f"Error in Discord Bot: {str(e)}")
 
@@ -370,6 +356,14 @@ settings_info = {
         "module": "All",
         "description": "Solana RPC URL for blockchain interactions"
     },
+    "solana_rpc_urls": {
+        "module": "All",
+        "description": "Extra Solana RPC URLs, comma separated; requests go to the fastest healthy one"
+    },
+    "rpc_hedge_requests": {
+        "module": "All",
+        "description": "true to resend slow RPC requests to a second endpoint after its usual (p95) latency"
+    },
     "botting_address": {
         "module": "All",
         "description": "Main botting wallet address"
@@ -378,6 +372,14 @@ settings_info = {
         "module": "All",
         "description": "Vault wallet address"
     },
+    "botting_wallets": {
+        "module": "Balance",
+        "description": "Extra botting wallets to monitor, comma separated as label:address"
+    },
+    "vault_wallets": {
+        "module": "Balance",
+        "description": "Extra vault wallets to monitor, comma separated as label:address"
+    },
     "discord_id": {
         "module": "All",
         "description": "Discord user ID for notifications"
@@ -410,6 +412,34 @@ settings_info = {
         "module": "Balance",
         "description": "Threshold for target wallet balance alerts"
     },
+    "check_empty_ct_requests_per_minute": {
+        "module": "EmptyCheck",
+        "description": "RPC budget for empty CT checks; wallets near the threshold are checked first (default 12)"
+    },
+    "check_empty_ct_concurrency": {
+        "module": "EmptyCheck",
+        "description": "How many empty CT balance requests may run at once (default 4)"
+    },
+    "your_balance_clear_threshold": {
+        "module": "Balance",
+        "description": "Balance your wallet must climb back to before a low balance alert clears (default: threshold + 5%)"
+    },
+    "balance_alert_renotify_minutes": {
+        "module": "Balance",
+        "description": "Minutes between repeated low balance alerts, comma separated; the last value repeats (default: 10,30,60)"
+    },
+    "balance_alert_escalate_after": {
+        "module": "Balance",
+        "description": "Ping your Discord ID from this alert number onwards (default: 3)"
+    },
+    "balance_alert_max_notifications": {
+        "module": "Balance",
+        "description": "Maximum alerts sent per low balance incident (default: 10)"
+    },
+    "balance_alert_cooldown_minutes": {
+        "module": "Balance",
+        "description": "Minutes after recovery before a new low balance incident can start (default: 10)"
+    },
     "bot_token": {
         "module": "Bot",
         "description": "Discord bot token for authentication"
@@ -418,9 +448,29 @@ settings_info = {
         "module": "Bot",
         "description": "Channel ID from your Sharp webhook"
     },
+    "sharp_webhook_channel_ids": {
+        "module": "Bot",
+        "description": "More Sharp webhook channel IDs to monitor, comma separated"
+    },
     "bot_stats_channel_id": {
         "module": "Bot",
         "description": "Channel ID for bot statistics"
+    },
+    "bot_stats_update_seconds": {
+        "module": "Bot",
+        "description": "Minimum seconds between edits of the stats message (default: 10)"
+    },
+    "bot_tracked_fields": {
+        "module": "Bot",
+        "description": "Extra Sharp embed fields to track, as 'Field Name:numeric|duration|categorical', comma separated"
+    },
+    "bot_backfill_hours": {
+        "module": "Bot",
+        "description": "Hours of channel history to scan on startup when there is no recent checkpoint (default: 24, max: 744)"
+    },
+    "bot_backfill_concurrency": {
+        "module": "Bot",
+        "description": "Time slices of channel history fetched in parallel during the startup scan (default: 4)"
     }
 }
 